@@ -1,14 +1,20 @@
 # ======================== MODULES ============
-from datetime import datetime
+import asyncio
+import json
+from datetime import date, datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
 import httpx
 import pandas as pd
 import typer
-from dateutil.relativedelta import relativedelta
+
+# Response cache and date windows shared with the AEMET Station Weather
+# Attributes component
+from aemet_cache import AemetCache, get_cached, put_cached
+from aemet_windows import date_windows
 
 # ================== CLASES ================
 
@@ -24,18 +30,27 @@ class Aemet:
     EMA_API_URL_STATIONS = urljoin(
         BASE_URL, "valores/climatologicos/inventarioestaciones/todasestaciones"
     )
-    DAILY_WEATHER_VALUE = urljoin(
-        BASE_URL,
-        "valores/climatologicos/diarios/datos/fechaini/{}/fechafin/{}/estacion/{}/?api_key={}",
-    )
+    DAILY_WEATHER_PATH = "valores/climatologicos/diarios/datos/fechaini/{}/fechafin/{}/estacion/{}/?api_key={}"
+    DAILY_WEATHER_VALUE = urljoin(BASE_URL, DAILY_WEATHER_PATH)
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = BASE_URL,
+        cache: Optional[AemetCache] = None,
+    ):
         self.api_key = api_key
+        self.cache = cache
+        self.daily_weather_value = urljoin(base_url, self.DAILY_WEATHER_PATH)
 
     def get_daily_weather(self, start_date: datetime, end_date: datetime, station: str):
+        cached = get_cached(self.cache, station, start_date, end_date)
+        if cached is not None:
+            return cached
+
         start_date_parse = start_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
         end_date_parse = end_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
-        url = self.DAILY_WEATHER_VALUE.format(
+        url = self.daily_weather_value.format(
             start_date_parse, end_date_parse, station, self.api_key
         )
         try:
@@ -44,7 +59,53 @@ class Aemet:
             print(e)
         data = r.json().get("datos")
         all_data: List[Dict[str, str]] = httpx.get(data)
-        return all_data.json()
+        return put_cached(self.cache, station, start_date, end_date, all_data.json())
+
+    async def get_daily_weather_async(
+        self,
+        client: httpx.AsyncClient,
+        start_date: datetime,
+        end_date: datetime,
+        station: str,
+    ):
+        cached = get_cached(self.cache, station, start_date, end_date)
+        if cached is not None:
+            return cached
+
+        start_date_parse = start_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
+        end_date_parse = end_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
+        url = self.daily_weather_value.format(
+            start_date_parse, end_date_parse, station, self.api_key
+        )
+        r = await client.get(url, headers=self._get_headers())
+        data = r.json().get("datos")
+        all_data = await client.get(data)
+        return put_cached(self.cache, station, start_date, end_date, all_data.json())
+
+    async def get_daily_weather_windows(
+        self,
+        windows: List[Tuple[datetime, datetime]],
+        station: str,
+        max_concurrency: int,
+    ):
+        # One pooled client shared by every window, at most max_concurrency in flight
+        limits = httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+        )
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+
+            async def fetch(start: datetime, end: datetime):
+                async with semaphore:
+                    return await self.get_daily_weather_async(
+                        client, start, end, station
+                    )
+
+            # gather keeps the results in the same order as the windows
+            return await asyncio.gather(
+                *(fetch(start, end) for start, end in windows), return_exceptions=True
+            )
 
     def _get_headers(self):
         return {"api_key": self.api_key}
@@ -53,40 +114,61 @@ class Aemet:
 # ===================== METHODS =====================
 
 
-def aemet_download_data(
-    station: str = typer.Option(..., help="Code of the station from AEMET"),
-    start_date: str = typer.Option(
-        ..., help="First date of the date range, format (yyyy-mm-dd)"
-    ),
-    end_date: str = typer.Option(
-        ..., help="Last date of the date range, format (yyyy-mm-dd)"
-    ),
-    aemet_api_key: str = typer.Option(
-        ...,
-        help="Api Key providing by AEMET web page (https://opendata.aemet.es/centrodedescargas/altaUsuario?)",
-    ),
-    delimiter: str = typer.Option(..., help="Delimiter of the output CSV File"),
+def merge_ranges(ranges: List[Tuple[datetime, datetime]]):
+    # Merge overlapping or contiguous date ranges
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(
+    start_date: datetime, end_date: datetime, covered: List[Tuple[datetime, datetime]]
 ):
-    # Parse Date
-    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
-    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+    # Date ranges between start_date and end_date not included in covered
+    gaps = []
+    cursor = start_date
+    for covered_start, covered_end in merge_ranges(covered):
+        if covered_end < cursor:
+            continue
+        if covered_start > end_date:
+            break
+        if covered_start > cursor:
+            gaps.append((cursor, covered_start - timedelta(days=1)))
+        cursor = covered_end + timedelta(days=1)
+    if cursor <= end_date:
+        gaps.append((cursor, end_date))
+    return gaps
 
-    # Download Aemet Data
-    aemet_client = Aemet(api_key=aemet_api_key)
-    daily_weather_values = []
-    start = start_date
-    try:
-        while start <= end_date:
-            daily_weather_values.extend(
-                aemet_client.get_daily_weather(
-                    start, start + relativedelta(years=3), station
-                )
-            )
 
-            start = start + relativedelta(day=1, years=3)
-    except Exception as e:
-        print(e)
+def read_manifest(path: Path):
+    with open(path, encoding="utf8") as f:
+        manifest = json.load(f)
+    return [
+        (
+            datetime.strptime(start, "%Y-%m-%d").date(),
+            datetime.strptime(end, "%Y-%m-%d").date(),
+        )
+        for start, end in manifest["ranges"]
+    ]
 
+
+def write_manifest(path: Path, station: str, ranges: List[Tuple[datetime, datetime]]):
+    manifest = {
+        "station": station,
+        "ranges": [
+            [start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")]
+            for start, end in merge_ranges(ranges)
+        ],
+    }
+    with open(path, "w", encoding="utf8") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def aemet_dataframe(daily_weather_values: List[Dict[str, str]], end_date: datetime):
     # Create Dataframe with Aemet Data
     dataframe = pd.json_normalize(daily_weather_values)
 
@@ -122,14 +204,113 @@ def aemet_download_data(
     dataframe["fecha"] = pd.to_datetime(dataframe["fecha"], format="%Y-%m-%d").dt.date
     dataframe = dataframe.drop(dataframe[dataframe["fecha"] > end_date].index)
     dataframe["prec"].loc[dataframe["prec"] == "Ip"] = 0
+    return dataframe
 
-    # Create CSV Outfile
+
+def aemet_download_data(
+    station: str = typer.Option(..., help="Code of the station from AEMET"),
+    start_date: str = typer.Option(
+        ..., help="First date of the date range, format (yyyy-mm-dd)"
+    ),
+    end_date: str = typer.Option(
+        ..., help="Last date of the date range, format (yyyy-mm-dd)"
+    ),
+    aemet_api_key: str = typer.Option(
+        ...,
+        help="Api Key providing by AEMET web page (https://opendata.aemet.es/centrodedescargas/altaUsuario?)",
+    ),
+    delimiter: str = typer.Option(..., help="Delimiter of the output CSV File"),
+    max_concurrency: int = typer.Option(
+        4, min=1, help="Maximum number of date windows downloaded at the same time"
+    ),
+    base_url: str = typer.Option(Aemet.BASE_URL, help="Base URL of the AEMET API"),
+    cache_dir: Optional[str] = typer.Option(
+        None, help="Directory of the persistent response cache, disabled if not set"
+    ),
+    cache_ttl: float = typer.Option(
+        86400, help="Seconds a cached window that is still open stays valid"
+    ),
+    cache_max_size: float = typer.Option(512, help="Maximum size of the cache in MB"),
+    incremental: bool = typer.Option(
+        False,
+        help="Only download the date ranges missing from an existing station CSV and merge them in place. "
+        "Without its manifest, every day missing from the CSV is downloaded again",
+    ),
+):
+    # Parse Date
+    start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
+    end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
+
+    # CSV Outfile and manifest with the date ranges it covers
     dirname = "data"
     filename = station + "_aemet_data"
     suffix = ".csv"
     path = Path(dirname, filename).with_suffix(suffix)
+    manifest_path = Path(dirname, filename + "_manifest").with_suffix(".json")
+
+    # Work out the date ranges to download
+    existing = None
+    covered = []
+    if incremental and path.is_file():
+        existing = pd.read_csv(path, sep=delimiter, dtype=str)
+        existing["fecha"] = pd.to_datetime(existing["fecha"], format="%Y-%m-%d").dt.date
+        if manifest_path.is_file():
+            covered = read_manifest(manifest_path)
+        else:
+            # Without a manifest only the dates of the file are covered, so the
+            # days missing inside it are downloaded again
+            covered = merge_ranges([(day, day) for day in existing["fecha"].unique()])
+    windows = [
+        window
+        for gap_start, gap_end in missing_ranges(start_date, end_date, covered)
+        for window in date_windows(gap_start, gap_end)
+    ]
+    if not windows:
+        print(f"Station {station} is up to date between {start_date} and {end_date}")
+        return
+
+    # Download Aemet Data
+    cache = (
+        AemetCache(cache_dir, ttl=cache_ttl, max_size_mb=cache_max_size)
+        if cache_dir
+        else None
+    )
+    aemet_client = Aemet(api_key=aemet_api_key, base_url=base_url, cache=cache)
+    results = asyncio.run(
+        aemet_client.get_daily_weather_windows(windows, station, max_concurrency)
+    )
+
+    # Merge windows in date order
+    daily_weather_values = []
+    for (start, end), result in zip(windows, results):
+        if isinstance(result, Exception):
+            print(f"Warning in station {station} at start date {start}: {result}")
+            continue
+        daily_weather_values.extend(result)
+        # Open windows only cover the days AEMET has already published
+        if end < date.today() - AemetCache.CLOSED_AFTER:
+            covered.append((start, end))
+        elif result:
+            last_date = max(
+                datetime.strptime(value["fecha"], "%Y-%m-%d").date() for value in result
+            )
+            covered.append((start, min(last_date, end)))
+
+    if existing is not None and not daily_weather_values:
+        print(f"Warning in station {station}: no new data downloaded")
+        write_manifest(manifest_path, station, covered)
+        return
+
+    dataframe = aemet_dataframe(daily_weather_values, end_date)
+    if existing is not None:
+        dataframe = (
+            pd.concat([existing, dataframe], ignore_index=True)
+            .drop_duplicates(subset="fecha", keep="last")
+            .sort_values("fecha")
+        )
 
     dataframe.to_csv(path, sep=delimiter, index=None)
+    write_manifest(manifest_path, station, covered)
 
 
 # ================ MAIN ============
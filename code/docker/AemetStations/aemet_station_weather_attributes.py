@@ -1,15 +1,20 @@
+import asyncio
 import json
 import os
+import time
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Dict, List
-from urllib.parse import urljoin
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
 
 import httpx
 import numpy as np
 import typer
-from dateutil.relativedelta import relativedelta
+
+# Response cache and date windows shared with the AEMET Download Data component
+from aemet_cache import AemetCache, get_cached, put_cached
+from aemet_windows import date_windows
 
 
 # ================ Classes ================
@@ -19,24 +24,49 @@ class Period(Enum):
     HOURLY = "HOURLY"
 
 
+# Rate limiter
+class HostRateLimiter:
+    def __init__(self, requests_per_second: float):
+        self.interval = 1 / requests_per_second if requests_per_second > 0 else 0
+        self._next_slot: Dict[str, float] = {}
+
+    async def wait(self, url: str):
+        # Reserve the next free slot of the host and sleep until it arrives
+        host = urlparse(url).netloc
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, now))
+        self._next_slot[host] = slot + self.interval
+        await asyncio.sleep(slot - now)
+
+
 # Aemet
 class Aemet:
     BASE_URL = "https://opendata.aemet.es/opendata/api/"
     EMA_API_URL_STATIONS = urljoin(
         BASE_URL, "valores/climatologicos/inventarioestaciones/todasestaciones"
     )
-    DAILY_WEATHER_VALUE = urljoin(
-        BASE_URL,
-        "valores/climatologicos/diarios/datos/fechaini/{}/fechafin/{}/estacion/{}/?api_key={}",
-    )
+    DAILY_WEATHER_PATH = "valores/climatologicos/diarios/datos/fechaini/{}/fechafin/{}/estacion/{}/?api_key={}"
+    DAILY_WEATHER_VALUE = urljoin(BASE_URL, DAILY_WEATHER_PATH)
+    RETRY_STATUS = {429, 500, 502, 503, 504}
 
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = BASE_URL,
+        cache: Optional[AemetCache] = None,
+    ):
         self.api_key = api_key
+        self.cache = cache
+        self.daily_weather_value = urljoin(base_url, self.DAILY_WEATHER_PATH)
 
     def get_daily_weather(self, start_date: str, end_date: str, station: str):
+        cached = get_cached(self.cache, station, start_date, end_date)
+        if cached is not None:
+            return cached
+
         start_date_parse = start_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
         end_date_parse = end_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
-        url = self.DAILY_WEATHER_VALUE.format(
+        url = self.daily_weather_value.format(
             start_date_parse, end_date_parse, station, self.api_key
         )
         try:
@@ -45,7 +75,96 @@ class Aemet:
             print(e)
         data = r.json().get("datos")
         all_data: List[Dict[str, str]] = httpx.get(data)
-        return all_data.json()
+        return put_cached(self.cache, station, start_date, end_date, all_data.json())
+
+    async def _get_with_retry(
+        self,
+        client: httpx.AsyncClient,
+        limiter: HostRateLimiter,
+        url: str,
+        max_retries: int,
+        backoff: float,
+        **kwargs,
+    ):
+        for attempt in range(max_retries + 1):
+            await limiter.wait(url)
+            try:
+                r = await client.get(url, **kwargs)
+                if r.status_code not in self.RETRY_STATUS:
+                    return r
+                error = f"HTTP {r.status_code}"
+            except httpx.TransportError as e:
+                error = e
+            if attempt < max_retries:
+                await asyncio.sleep(backoff * 2**attempt)
+        raise Exception(f"Giving up after {max_retries + 1} attempts: {error}")
+
+    async def get_daily_weather_async(
+        self,
+        client: httpx.AsyncClient,
+        limiter: HostRateLimiter,
+        start_date: datetime,
+        end_date: datetime,
+        station: str,
+        max_retries: int,
+        backoff: float,
+    ):
+        cached = get_cached(self.cache, station, start_date, end_date)
+        if cached is not None:
+            return cached
+
+        start_date_parse = start_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
+        end_date_parse = end_date.strftime("%Y-%m-%dT%H:%M:%SUTC")
+        url = self.daily_weather_value.format(
+            start_date_parse, end_date_parse, station, self.api_key
+        )
+        r = await self._get_with_retry(
+            client, limiter, url, max_retries, backoff, headers=self._get_headers()
+        )
+        data = r.json().get("datos")
+        all_data = await self._get_with_retry(
+            client, limiter, data, max_retries, backoff
+        )
+        return put_cached(self.cache, station, start_date, end_date, all_data.json())
+
+    async def get_stations_daily_weather(
+        self,
+        stations: List[str],
+        windows: List[Tuple[datetime, datetime]],
+        max_concurrency: int,
+        requests_per_second: float,
+        max_retries: int,
+        backoff: float,
+    ):
+        # Every (station, window) pair goes through the same bounded scheduler
+        limits = httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+        )
+        semaphore = asyncio.Semaphore(max_concurrency)
+        limiter = HostRateLimiter(requests_per_second)
+
+        async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+
+            async def fetch(station: str, start: datetime, end: datetime):
+                async with semaphore:
+                    return await self.get_daily_weather_async(
+                        client, limiter, start, end, station, max_retries, backoff
+                    )
+
+            results = await asyncio.gather(
+                *(
+                    fetch(station, start, end)
+                    for station in stations
+                    for start, end in windows
+                ),
+                return_exceptions=True,
+            )
+
+        # Regroup the flat result list per station, keeping the station order
+        return [
+            results[i * len(windows) : (i + 1) * len(windows)]
+            for i in range(len(stations))
+        ]
 
     def _get_headers(self):
         return {"api_key": self.api_key}
@@ -68,6 +187,29 @@ def aemet_station_weather_attributes(
     analysis_stations: List[str] = typer.Option(
         ..., help="Station list for AEMET data search."
     ),
+    parallel: bool = typer.Option(
+        False, help="Download all stations and date windows concurrently."
+    ),
+    max_concurrency: int = typer.Option(
+        4, min=1, help="Maximum number of requests in flight in parallel mode."
+    ),
+    requests_per_second: float = typer.Option(
+        2.0, help="Maximum requests per second to each host in parallel mode."
+    ),
+    max_retries: int = typer.Option(
+        3, min=0, help="Retries per request on network errors or 429/5xx responses."
+    ),
+    backoff: float = typer.Option(
+        1.0, help="Initial backoff in seconds between retries, doubled per attempt."
+    ),
+    base_url: str = typer.Option(Aemet.BASE_URL, help="Base URL of the AEMET API."),
+    cache_dir: Optional[str] = typer.Option(
+        None, help="Directory of the persistent response cache, disabled if not set."
+    ),
+    cache_ttl: float = typer.Option(
+        86400, help="Seconds a cached window that is still open stays valid."
+    ),
+    cache_max_size: float = typer.Option(512, help="Maximum size of the cache in MB."),
 ):
     os.chdir("data")
 
@@ -76,27 +218,53 @@ def aemet_station_weather_attributes(
     end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
     # Download AEMET Data
-    aemet_client = Aemet(api_key=aemet_api_key)
+    cache = (
+        AemetCache(cache_dir, ttl=cache_ttl, max_size_mb=cache_max_size)
+        if cache_dir
+        else None
+    )
+    aemet_client = Aemet(api_key=aemet_api_key, base_url=base_url, cache=cache)
     stations_weather_values = []
-    try:
-        for station in analysis_stations:
+    if parallel:
+        windows = date_windows(start_date, end_date)
+        stations_results = asyncio.run(
+            aemet_client.get_stations_daily_weather(
+                analysis_stations,
+                windows,
+                max_concurrency,
+                requests_per_second,
+                max_retries,
+                backoff,
+            )
+        )
+        for station, results in zip(analysis_stations, stations_results):
             daily_weather_values = []
-            start = start_date
-            while start <= end_date:
-                try:
-                    daily_weather_values.extend(
-                        aemet_client.get_daily_weather(
-                            start, start + relativedelta(years=3), station
-                        )
+            for (start, _), result in zip(windows, results):
+                if isinstance(result, Exception):
+                    print(
+                        f"Warning in station {station} at start date {start}: {result}"
                     )
-                except Exception as e:
-                    print(f"Warning in station {station} at start date {start}: {e}")
-                    pass
-
-                start = start + relativedelta(day=1, years=3)
+                else:
+                    daily_weather_values.extend(result)
             stations_weather_values.append(daily_weather_values)
-    except Exception as e:
-        print(f"Warning in station {station} at start date {start}: {e}")
+    else:
+        try:
+            for station in analysis_stations:
+                daily_weather_values = []
+                for start, end in date_windows(start_date, end_date):
+                    try:
+                        daily_weather_values.extend(
+                            aemet_client.get_daily_weather(start, end, station)
+                        )
+                    except Exception as e:
+                        print(
+                            f"Warning in station {station} at start date {start}: {e}"
+                        )
+                        pass
+
+                stations_weather_values.append(daily_weather_values)
+        except Exception as e:
+            print(f"Warning in station {station} at start date {start}: {e}")
 
     # JSON Dumps with UTF-8 encoding
     dirname = ""
@@ -1,65 +1,185 @@
+import math
 import os
+import shutil
+from enum import Enum
 from pathlib import Path
+from typing import Dict, List
 
+import numpy as np
 import pandas as pd
 import typer
 
+# Metric columns of the metrics file and whether higher values are better
+METRICS = {
+    "r2_mean": True,
+    "mae_mean": False,
+    "rmse_mean": False,
+    "rmse_mae_mean": False,
+}
+
+
+class PublishMode(str, Enum):
+    # How the best candidate is exposed as best_<file>
+    link = "link"
+    rename = "rename"
+
 
 # ======== METHOD ========
+def rank_candidates(metrics: pd.DataFrame, weights: Dict[str, float] = None):
+    """
+    Every metric votes for its best candidate with its weight (1 by default).
+    Candidates are sorted by votes, ties are broken by the highest r2_mean
+    (missing values last) and then by their order in the metrics file
+    """
+    weights = {metric: 1.0 for metric in METRICS} if weights is None else weights
+    for metric in weights:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}, use one of {list(METRICS)}")
+
+    votes = np.zeros(len(metrics))
+    voters = 0
+    for metric, weight in weights.items():
+        values = metrics[metric].to_numpy(dtype=float)
+        # Missing values never win a vote, a metric missing for every candidate
+        # does not vote
+        if np.isnan(values).all():
+            print(f"No value of {metric} for any candidate, it does not vote")
+            continue
+        best = np.nanargmax(values) if METRICS[metric] else np.nanargmin(values)
+        votes[best] += weight
+        voters += 1
+    if not voters:
+        raise ValueError(f"No values of {list(weights)} to rank the candidates")
+
+    order = np.lexsort(
+        (np.arange(len(metrics)), -metrics["r2_mean"].to_numpy(dtype=float), -votes)
+    )
+    ranking = metrics.iloc[order].copy()
+    ranking.insert(1, "votes", votes[order])
+    return ranking
+
+
+def parse_weights(weight: List[str]):
+    # {metric: weight} of the metric:weight entries of --weight
+    weights = {}
+    for entry in weight:
+        metric, separator, value = entry.rpartition(":")
+        if not separator:
+            raise typer.BadParameter(
+                f"{entry!r} is not metric:weight", param_hint="--weight"
+            )
+        if metric not in METRICS:
+            raise typer.BadParameter(
+                f"unknown metric {metric!r}, use one of {list(METRICS)}",
+                param_hint="--weight",
+            )
+        try:
+            weights[metric] = float(value)
+        except ValueError:
+            weights[metric] = math.nan
+        # Also rejects nan and inf
+        if not 0 <= weights[metric] < math.inf:
+            raise typer.BadParameter(
+                f"weight {value!r} of {metric} is not a number of at least 0",
+                param_hint="--weight",
+            )
+    return weights
+
+
+def check_weights(weight: List[str]):
+    # --weight callback, bad entries are rejected before any file is read
+    parse_weights(weight)
+    return weight
+
+
+def candidate_files(filepaths: List[str]):
+    # {filename: filepath} of the candidates, the metrics file names them by
+    # their file name without extension
+    files = {}
+    for filepath in filepaths:
+        stem = Path(filepath).stem
+        if stem in files and files[stem] != filepath:
+            raise typer.BadParameter(
+                f"{files[stem]!r} and {filepath!r} have the same file name, the "
+                "metrics file cannot tell them apart",
+                param_hint="--filepath-candidate",
+            )
+        files[stem] = filepath
+    return files
+
+
+def publish(source: Path, target: Path, mode: PublishMode = PublishMode.link):
+    # Expose the chosen file under its new name without reading it: a hard link
+    # (a copy where links are not supported) or a rename of the candidate
+    if target.exists():
+        target.unlink()
+    if mode == PublishMode.rename:
+        os.replace(source, target)
+        return
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
 def choose_metric_csv(
     filepath_metrics: str = typer.Option(..., help="Filepath of the csv metrics file"),
+    filepath_candidate: List[str] = typer.Option(
+        [],
+        help="Filepath of a candidate csv file, repeat the option for every candidate. "
+        "By default every file of the metrics file is a candidate",
+    ),
     filepath_pandas: str = typer.Option(
-        ..., help="Filepath of the pandas interpolate file"
+        None, help="Filepath of the pandas interpolate file"
     ),
     filepath_mean: str = typer.Option(
-        ..., help="Filepath of the mean interpolate file"
+        None, help="Filepath of the mean interpolate file"
     ),
     delimiter: str = typer.Option(..., help="Delimiter of the csv file"),
+    weight: List[str] = typer.Option(
+        [],
+        help="Weight of a metric vote as metric:weight, e.g. r2_mean:2. "
+        "Metrics not given keep weight 1",
+        callback=check_weights,
+    ),
+    publish_mode: PublishMode = typer.Option(
+        PublishMode.link,
+        help="How the best file is published: a hard link to the candidate or its rename",
+    ),
 ):
     os.chdir("data")
 
-    df = pd.read_csv(filepath_metrics, delimiter=delimiter)
-
-    best_file = ""
-
-    best_r2_ = df["r2_mean"].idxmax()
-    best_mae_mean = df["mae_mean"].idxmin()
-    best_rmse_mean = df["rmse_mean"].idxmin()
-    best_rmse_mae_mean = df["rmse_mae_mean"].idxmin()
-
-    list_best = [best_r2_, best_mae_mean, best_rmse_mean, best_rmse_mae_mean]
-
-    dict_ocurrence = dict()
-    for index, row in df.iterrows():
-        dict_ocurrence[index] = list_best.count(index)
+    metrics = pd.read_csv(filepath_metrics, delimiter=delimiter)
+
+    candidates = list(filepath_candidate) + [
+        filepath for filepath in (filepath_pandas, filepath_mean) if filepath
+    ]
+    if candidates:
+        files = candidate_files(candidates)
+        # Candidates without metrics cannot be ranked
+        missing = set(files) - set(metrics["filename"])
+        if missing:
+            print(f"No metrics for {sorted(missing)} in {filepath_metrics}, skipped")
+        metrics = metrics[metrics["filename"].isin(files)].reset_index(drop=True)
+        if metrics.empty:
+            raise ValueError(f"No metrics for any candidate in {filepath_metrics}")
+    else:
+        files = {filename: filename + ".csv" for filename in metrics["filename"]}
 
-    ocurrence_values = list(dict_ocurrence.values())
-    max_ocurrence = max(ocurrence_values)
-    count_max_ocurrence = ocurrence_values.count(max_ocurrence)
+    weights = dict.fromkeys(METRICS, 1.0)
+    weights.update(parse_weights(weight))
+    ranking = rank_candidates(metrics, weights)
+    print(ranking.to_string(index=False))
 
-    if count_max_ocurrence == 1:
-        indx = ocurrence_values.index(max_ocurrence)
-        best_file = df["filename"].iloc[indx] + ".csv"
-    else:
-        max_r2 = 0
-        for elem in dict_ocurrence:
-            if dict_ocurrence[elem] == max_ocurrence:
-                if df["r2_mean"].iloc[elem] > max_r2:
-                    max_r2 = df["r2_mean"].iloc[elem]
-                    best_file = df["filename"].iloc[elem] + ".csv"
-
-    if best_file == filepath_pandas:
-        df_final = pd.read_csv(filepath_pandas, sep=delimiter)
-    elif best_file == filepath_mean:
-        df_final = pd.read_csv(filepath_mean, sep=delimiter)
+    best_file = files[ranking["filename"].iloc[0]]
 
     dirname = ""
-    filename = "best_" + best_file
+    filename = "best_" + Path(best_file).name
     extension = ".csv"
 
     path = Path(dirname, filename).with_suffix(extension)
 
-    df_final.to_csv(path, sep=delimiter, index=None)
+    publish(Path(best_file), path, publish_mode)
 
 
 # ======== MAIN ========
@@ -5,9 +5,11 @@ from typing import Tuple
 
 import pandas as pd
 import typer
-from numpy import savetxt
 from sklearn.preprocessing import MinMaxScaler
 
+# Array files shared with the Split Sequences Multivariable and LSTM Model components
+from array_files import OUTPUT_FORMATS, save_array
+
 
 def minmax_scaler(df: pd.DataFrame) -> Tuple[pd.DataFrame, MinMaxScaler]:
     """
@@ -27,6 +29,10 @@ def data_normalization(
     delimiter: str = typer.Option(
         ..., help="Delimiter of the input file and output file. Must be the same"
     ),
+    output_format: str = typer.Option(
+        "csv",
+        help="Format of the normalized arrays: csv, npy or npz. Binary formats are read back without parsing text",
+    ),
 ):
     """
     Given a pandas dataframe, it's split in two dataframes (features and target) and then they are normalized with MinMaxScaler
@@ -34,6 +40,9 @@ def data_normalization(
     Returns two normalized dataframes (features and target) and their scalers
     """
 
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}")
+
     os.chdir("data")
 
     # Read dataframe
@@ -46,16 +55,16 @@ def data_normalization(
     scaled_data, scaler = minmax_scaler(data)
     scaled_target, scaler_target = minmax_scaler(target_df)
 
-    # Save numpy array as CSV
+    # Save numpy arrays
     dirname = ""
     filename = "dataset_norm" + "_features"
     filename_target = "dataset_norm" + "_target"
-    suffix = ".csv"
+    suffix = "." + output_format
     path = Path(dirname, filename).with_suffix(suffix)
     path_target = Path(dirname, filename_target).with_suffix(suffix)
 
-    savetxt(path, scaled_data, delimiter=delimiter)
-    savetxt(path_target, scaled_target, delimiter=delimiter)
+    save_array(path, scaled_data, delimiter)
+    save_array(path_target, scaled_target, delimiter)
 
     # save the scaler
     scaler_suffix = ".pkl"
@@ -8,6 +8,53 @@ import typer
 
 
 # =============== METHODS ===============
+def window_sum(column: pd.Series, window: int):
+    # Sum of the last `window` values, added in the same order as a row by row sum.
+    # The first `window` rows are left empty as warm-up
+    total = column.shift(window - 1)
+    for lag in range(window - 2, -1, -1):
+        total = total + column.shift(lag)
+    total.iloc[:window] = np.nan
+    return total
+
+
+def round_statistic(values: pd.Series, name: str):
+    # Decimals of the original row by row statistics: 3, except the 3 rows
+    # accumulated value that is rounded to 2 decimals from the sixth row on
+    rounded = values.round(3)
+    if name.endswith("_acum_3") and len(values) > 5:
+        rounded.iloc[5:] = values.iloc[5:].round(2)
+    return rounded
+
+
+def rolling_statistics(
+    dataframe: pd.DataFrame,
+    acum_list_attr: List[str],
+    mm_list_attr: List[str],
+    windows: List[int],
+):
+    if any(window < 1 for window in windows):
+        raise ValueError(f"Window sizes must be at least 1, got {list(windows)}")
+    total_list_attr = list(dict.fromkeys(mm_list_attr + acum_list_attr))
+    windows = sorted(set(windows), reverse=True)
+
+    statistics = {}
+    for attr in total_list_attr:
+        sums = {window: window_sum(dataframe[attr], window) for window in windows}
+        if attr in acum_list_attr:
+            for window in windows:
+                name = f"{attr}_acum_{window}"
+                statistics[name] = round_statistic(sums[window], name)
+        if attr in mm_list_attr:
+            for window in windows:
+                name = f"{attr}_MM{window}"
+                statistics[name] = round_statistic(sums[window] / window, name)
+
+    return pd.concat(
+        [dataframe, pd.DataFrame(statistics, index=dataframe.index)], axis=1
+    )
+
+
 def aemet_add_statistics(
     filepath: str = typer.Option(..., help="File path of the CSV File"),
     acum_list_attr: List[str] = typer.Option(
@@ -20,90 +67,19 @@ def aemet_add_statistics(
     outfile_name: str = typer.Option(
         ..., help="Name of the output CSV file without extension"
     ),
+    windows: List[int] = typer.Option(
+        [3, 5],
+        min=1,
+        help="Window sizes in rows of the accumulated and moving mean statistics",
+    ),
 ):
     os.chdir("data")
 
-    total_list_attr = mm_list_attr + acum_list_attr
-    total_list_attr = list(dict.fromkeys(total_list_attr))
-
     # Read dataframe
     dataframe = pd.read_csv(filepath, sep=delimiter)
 
     # Statistics for each attribute
-    cnt_i = 0
-    while cnt_i < len(dataframe):
-        for attr in total_list_attr:
-            if cnt_i in range(0, 3, 1):
-                if attr in acum_list_attr:
-                    dataframe.loc[cnt_i, attr + "_acum_5"] = np.nan
-                    dataframe.loc[cnt_i, attr + "_acum_3"] = np.nan
-                if attr in mm_list_attr:
-                    dataframe.loc[cnt_i, attr + "_MM5"] = np.nan
-                    dataframe.loc[cnt_i, attr + "_MM3"] = np.nan
-            elif cnt_i in range(3, 5, 1):
-                if attr in mm_list_attr:
-                    dataframe.loc[cnt_i, attr + "_MM3"] = round(
-                        (
-                            dataframe.loc[cnt_i - 2, attr]
-                            + dataframe.loc[cnt_i - 1, attr]
-                            + dataframe.loc[cnt_i, attr]
-                        )
-                        / 3,
-                        3,
-                    )
-                    dataframe.loc[cnt_i, attr + "_MM5"] = np.nan
-                if attr in acum_list_attr:
-                    dataframe.loc[cnt_i, attr + "_acum_3"] = round(
-                        (
-                            dataframe.loc[cnt_i - 2, attr]
-                            + dataframe.loc[cnt_i - 1, attr]
-                            + dataframe.loc[cnt_i, attr]
-                        ),
-                        3,
-                    )
-                    dataframe.loc[cnt_i, attr + "_acum_5"] = np.nan
-            else:
-                if attr in mm_list_attr:
-                    dataframe.loc[cnt_i, attr + "_MM3"] = round(
-                        (
-                            dataframe.loc[cnt_i - 2, attr]
-                            + dataframe.loc[cnt_i - 1, attr]
-                            + dataframe.loc[cnt_i, attr]
-                        )
-                        / 3,
-                        3,
-                    )
-                    dataframe.loc[cnt_i, attr + "_MM5"] = round(
-                        (
-                            dataframe.loc[cnt_i - 4, attr]
-                            + dataframe.loc[cnt_i - 3, attr]
-                            + dataframe.loc[cnt_i - 2, attr]
-                            + dataframe.loc[cnt_i - 1, attr]
-                            + dataframe.loc[cnt_i, attr]
-                        )
-                        / 5,
-                        3,
-                    )
-                if attr in acum_list_attr:
-                    dataframe.loc[cnt_i, attr + "_acum_3"] = round(
-                        (
-                            dataframe.loc[cnt_i - 2, attr]
-                            + dataframe.loc[cnt_i - 1, attr]
-                            + dataframe.loc[cnt_i, attr]
-                        ),
-                        2,
-                    )
-                    dataframe.loc[cnt_i, attr + "_acum_5"] = round(
-                        (
-                            dataframe.loc[cnt_i - 4, attr]
-                            + dataframe.loc[cnt_i - 3, attr]
-                            + dataframe.loc[cnt_i - 2, attr]
-                            + dataframe.loc[cnt_i - 1, attr]
-                            + dataframe.loc[cnt_i, attr]
-                        ),
-                        3,
-                    )
-        cnt_i += 1
+    dataframe = rolling_statistics(dataframe, acum_list_attr, mm_list_attr, windows)
 
     # Outfile
     dirname = ""
@@ -1,9 +1,14 @@
 import math
 import os
+from collections import Counter
 from pathlib import Path
+from typing import List
 
+import h5py
 import keras
+import numpy as np
 import pandas as pd
+import tensorflow as tf
 import typer
 from numpy import load, ndarray, savetxt
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
@@ -22,62 +27,148 @@ def compute_metrics(test: ndarray, pred: ndarray) -> dict:
     return {"MAE": mae_lstm, "RMSE": rmse_lstm, "R2 Score": r2_lstm}
 
 
+class CheckpointPredictor:
+    """
+    Predicts with many saved checkpoints in one process. Checkpoints sharing an
+    architecture only load their weights into the same model, which is run in
+    fixed-size batches by a traced inference function
+    """
+
+    def __init__(self, batch_size: int = 256):
+        self.batch_size = batch_size
+        # model config or file path -> (model, inference function)
+        self.models = {}
+
+    def load(self, filepath: str):
+        if not h5py.is_hdf5(filepath):
+            key = filepath
+        else:
+            with h5py.File(filepath, "r") as f:
+                key = f.attrs.get("model_config", filepath)
+            if key in self.models:
+                model, infer = self.models[key]
+                model.load_weights(filepath)
+                return model, infer
+
+        # The optimizer state is not needed to predict
+        model = keras.models.load_model(filepath, compile=False)
+        input_signature = [
+            tf.TensorSpec((None,) + tuple(model.input_shape[1:]), model.inputs[0].dtype)
+        ]
+        infer = tf.function(
+            lambda x: model(x, training=False), input_signature=input_signature
+        )
+        self.models[key] = (model, infer)
+        return model, infer
+
+    def predict(self, filepath: str, X: ndarray) -> ndarray:
+        model, infer = self.load(filepath)
+        dtype = tf.as_dtype(model.inputs[0].dtype).as_numpy_dtype
+        return np.concatenate(
+            [
+                infer(
+                    np.asarray(X[start : start + self.batch_size], dtype=dtype)
+                ).numpy()
+                for start in range(0, len(X), self.batch_size)
+            ]
+        )
+
+
+def output_names(model_paths: List[str]) -> List[str]:
+    """
+    Suffix of the output files of each model: the model file name, followed by
+    its position in model_paths when several models share the same file name.
+
+    Returns a list of unique names, in the order of model_paths
+    """
+    if len(set(model_paths)) != len(model_paths):
+        raise typer.BadParameter(
+            "the same model is given twice", param_hint="--filepath-model"
+        )
+    stems = [Path(model_path).stem for model_path in model_paths]
+    counts = Counter(stems)
+    names = [
+        stem if counts[stem] == 1 else f"{stem}_{position}"
+        for position, stem in enumerate(stems, 1)
+    ]
+    if len(set(names)) != len(names):
+        raise typer.BadParameter(
+            f"the output names {names} of the models are not unique, rename them",
+            param_hint="--filepath-model",
+        )
+    return names
+
+
 def lstm_evaluation(
     filepath_X: str = typer.Option(..., help="File path of X_test csv file"),
     filepath_Y: str = typer.Option(..., help="File path of Y_test csv file"),
-    filepath_model: str = typer.Option(..., help="File path of the model"),
+    filepath_model: List[str] = typer.Option(
+        ...,
+        help="File path of the model. Repeat the option to evaluate several checkpoints in one run",
+    ),
     filepath_scaler_y: str = typer.Option(
         ..., help="File path of the Scaler target object used for data normalization"
     ),
     delimiter: str = typer.Option(
         ..., help="Delimiter of the input file and output file. Must be the same"
     ),
+    batch_size: int = typer.Option(256, help="Number of windows predicted at once"),
 ):
     """
     Given X_test, y_test and the trained model, make predictions and evaluate the model
 
     Returns the model' metrics and predictions
     """
+    # Output files are named after the models, reject clashes before any work
+    names = output_names(filepath_model)
+
     os.chdir("data")
 
     # Load X_test and y_test array from CSV
     X_test = load(filepath_X)
     y_test = load(filepath_Y)
 
-    # Load Best model
-    best_model = keras.models.load_model(filepath_model)
-
     # load the scaler .pkl
     scaler_target = load(open(filepath_scaler_y, "rb"), allow_pickle=True)
 
-    # MAKE PREDICTIONS
-    y_hat = best_model.predict(X_test)
     test = pd.DataFrame(y_test[:, -1]).values
-    pred = pd.DataFrame(y_hat[:, -1, 0]).values
-
     test_inv = scaler_target.inverse_transform(test)
     # test_inv = np.squeeze(test_inv)
 
-    pred_inv = scaler_target.inverse_transform(pred)
-    # pred_inv = np.squeeze(pred_inv)
-
-    # CALCULATE METRICS
-    metrics = compute_metrics(test_inv, pred_inv)
-
-    # Save metrics and predictions
-    suffix = ".csv"
-    dirname = ""
-
-    # Save metrics in dataframe CSV
-    df_metrics = pd.DataFrame.from_dict(metrics, orient="index", columns=["Value"])
-    path = Path(dirname, "lstm_metrics").with_suffix(suffix)
-    df_metrics.to_csv(path, sep=delimiter)
-
-    # Save predictions numpy array as CSV
-    dirname = ""
-    suffix = ".csv"
-    path_predictions = Path(dirname, "lstm_predictions").with_suffix(suffix)
-    savetxt(path_predictions, pred_inv, delimiter=delimiter)
+    predictor = CheckpointPredictor(batch_size)
+    models_metrics = {}
+    for model_path, model_name in zip(filepath_model, names):
+        # MAKE PREDICTIONS
+        y_hat = predictor.predict(model_path, X_test)
+        pred = pd.DataFrame(y_hat[:, -1, 0]).values
+
+        pred_inv = scaler_target.inverse_transform(pred)
+        # pred_inv = np.squeeze(pred_inv)
+
+        # CALCULATE METRICS
+        metrics = compute_metrics(test_inv, pred_inv)
+        models_metrics[model_path] = metrics
+
+        # Save metrics and predictions, named after the model with several checkpoints
+        suffix = ".csv"
+        dirname = ""
+        name = "" if len(filepath_model) == 1 else "_" + model_name
+
+        # Save metrics in dataframe CSV
+        df_metrics = pd.DataFrame.from_dict(metrics, orient="index", columns=["Value"])
+        path = Path(dirname, f"lstm_metrics{name}{suffix}")
+        df_metrics.to_csv(path, sep=delimiter)
+
+        # Save predictions numpy array as CSV
+        path_predictions = Path(dirname, f"lstm_predictions{name}{suffix}")
+        savetxt(path_predictions, pred_inv, delimiter=delimiter)
+
+    if len(filepath_model) > 1:
+        # One row of metrics per checkpoint
+        df_models_metrics = pd.DataFrame.from_dict(models_metrics, orient="index")
+        df_models_metrics.index.name = "model"
+        path = Path("", "lstm_models_metrics.csv")
+        df_models_metrics.to_csv(path, sep=delimiter)
 
 
 # ============ MAIN ============
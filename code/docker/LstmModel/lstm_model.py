@@ -1,15 +1,128 @@
+import json
+import math
+import multiprocessing
 import os
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Tuple
 
 import keras
 import keras.metrics as metric
+import numpy as np
+import pandas as pd
+import tensorflow as tf
 import typer
-from keras.callbacks import ModelCheckpoint, ReduceLROnPlateau
+from keras.callbacks import Callback, ModelCheckpoint, ReduceLROnPlateau
 from keras.layers import (LSTM, Conv1D, Dense, Flatten, MaxPooling1D,
                           RepeatVector, TimeDistributed)
 from keras.models import Sequential
-from numpy import load, loadtxt, ndarray, save
+from keras.utils import Sequence
+from numpy import asarray, ndarray, save
+
+# Array files shared with the Data Normalization and Split Sequences Multivariable
+# components
+from array_files import load_array
+
+# CPU count shared with the other components running parallel workers
+from cpus import available_cpus
+
+
+class WindowSequence(Sequence):
+    """
+    Batches of supervised windows read on demand, so memory-mapped arrays are
+    only loaded one batch at a time
+    """
+
+    def __init__(self, X: ndarray, y: ndarray, batch_size: int = 32):
+        super().__init__()
+        self.X = X
+        self.y = y
+        self.batch_size = batch_size
+
+    def __len__(self):
+        return math.ceil(len(self.X) / self.batch_size)
+
+    def __getitem__(self, index):
+        batch = slice(index * self.batch_size, (index + 1) * self.batch_size)
+        return asarray(self.X[batch]), asarray(self.y[batch])
+
+
+class TrainingMonitor(Callback):
+    """
+    Logs epoch time, samples per second and peak memory to a JSON file after
+    every epoch, and stops training before an epoch would exceed time_budget
+    seconds (0 for no limit)
+    """
+
+    def __init__(
+        self, n_samples: int, metrics_path: str, batch_size: int, time_budget=0
+    ):
+        super().__init__()
+        self.n_samples = n_samples
+        self.metrics_path = metrics_path
+        self.batch_size = batch_size
+        self.time_budget = time_budget
+
+    def on_train_begin(self, logs=None):
+        self.train_start = time.perf_counter()
+        self.epochs = []
+        self.stop_reason = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        now = time.perf_counter()
+        epoch_time = now - self.epoch_start
+        self.epochs.append(
+            {
+                "epoch": epoch + 1,
+                "epoch_time": epoch_time,
+                "samples_per_second": self.n_samples / epoch_time,
+                # ru_maxrss is in KB on Linux
+                "peak_memory_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+                **{name: float(value) for name, value in (logs or {}).items()},
+            }
+        )
+
+        # Assume the next epoch takes as long as this one
+        elapsed = now - self.train_start
+        if self.time_budget and elapsed + epoch_time > self.time_budget:
+            self.model.stop_training = True
+            self.stop_reason = "time_budget"
+        self.write()
+
+    def on_train_end(self, logs=None):
+        if self.stop_reason is None:
+            self.stop_reason = (
+                "early_stopping" if self.model.stop_training else "max_epochs"
+            )
+        self.write()
+
+    def write(self):
+        epochs_run = len(self.epochs)
+        epochs_time = sum(epoch["epoch_time"] for epoch in self.epochs)
+        metrics = {
+            "batch_size": self.batch_size,
+            "samples": self.n_samples,
+            "time_budget": self.time_budget,
+            "epochs_run": epochs_run,
+            "stop_reason": self.stop_reason,
+            "total_time": time.perf_counter() - self.train_start,
+            "mean_epoch_time": epochs_time / epochs_run if epochs_run else None,
+            "samples_per_second": (
+                self.n_samples * epochs_run / epochs_time if epochs_run else None
+            ),
+            "peak_memory_mb": max(
+                (epoch["peak_memory_mb"] for epoch in self.epochs), default=None
+            ),
+            "epochs": self.epochs,
+        }
+        with open(self.metrics_path, "w") as f:
+            json.dump(metrics, f, indent=2)
 
 
 def split_train_test(
@@ -31,31 +144,194 @@ def train_model(
     y_test: ndarray,
     model: Sequential,
     saved_model: str,
+    batch_size: int = 32,
+    epochs: int = 1000,
+    time_budget: float = 0,
+    metrics_path: str = "lstm_training_metrics.json",
+    verbose: int = 1,
 ) -> Sequential:
 
-    checkpointer = ModelCheckpoint(filepath=saved_model, verbose=1, save_best_only=True)
+    # A checkpoint left by a previous run must not stand for this training
+    Path(saved_model).unlink(missing_ok=True)
+    checkpointer = ModelCheckpoint(
+        filepath=saved_model, verbose=verbose, save_best_only=True
+    )
 
     early_stop = keras.callbacks.EarlyStopping(
         monitor="val_loss", patience=20, restore_best_weights=True
     )
     sch = ReduceLROnPlateau(
-        monitor="val_loss", factor=0.01, patience=5, min_lr=1e-8, verbose=1
+        monitor="val_loss", factor=0.01, patience=5, min_lr=1e-8, verbose=verbose
     )
 
+    # Keras shuffles the order of the batches, each batch is a contiguous read
+    monitor = TrainingMonitor(len(X_train), metrics_path, batch_size, time_budget)
+
     model.fit(
+        WindowSequence(X_train, y_train, batch_size),
+        epochs=epochs,
+        validation_data=WindowSequence(X_test, y_test, batch_size),
+        callbacks=[checkpointer, sch, early_stop, monitor],
+        verbose=verbose,
+    )
+    # No checkpoint when val_loss never improved (NaN losses or a time budget
+    # spent before the first epoch end), keep the trained weights
+    if not Path(saved_model).is_file():
+        model.save(saved_model)
+
+    return model
+
+
+def build_model(
+    n_steps_in: int, n_steps_out: int, n_features: int, n_neurons: int
+) -> Sequential:
+    model = Sequential()
+    model.add(
+        Conv1D(
+            filters=64,
+            kernel_size=3,
+            activation="relu",
+            input_shape=(n_steps_in, n_features),
+        )
+    )
+    model.add(Conv1D(filters=64, kernel_size=3, activation="relu"))
+    model.add(MaxPooling1D(pool_size=2))
+    model.add(Flatten())
+
+    model.add(RepeatVector(n_steps_out))
+    model.add(LSTM(n_neurons, activation="relu", return_sequences=True))
+    model.add(TimeDistributed(Dense(n_neurons, activation="relu")))
+    model.add(TimeDistributed(Dense(1)))
+
+    model.compile(loss="mse", optimizer="adam", metrics=[metric.RootMeanSquaredError()])
+    return model
+
+
+def rolling_origin_folds(n_windows: int, n_folds: int, n_steps_out: int):
+    """
+    Rolling origin folds over the windows, as (train_end, validation_start,
+    validation_end) indices. Each fold validates on the n_steps_out windows that
+    follow its training windows, the last one on the same windows as
+    split_train_test. A gap of n_steps_out - 1 windows keeps the training targets
+    from overlapping the validation targets
+
+    Returns the list of folds, oldest first
+    """
+    folds = []
+    for fold in range(n_folds):
+        validation_end = n_windows - (n_folds - 1 - fold) * n_steps_out
+        validation_start = validation_end - n_steps_out
+        train_end = validation_start - (n_steps_out - 1)
+        if train_end <= 0:
+            raise ValueError(
+                f"{n_windows} windows are not enough for {n_folds} folds of {n_steps_out}"
+            )
+        folds.append((train_end, validation_start, validation_end))
+    return folds
+
+
+# Windows and training settings shared with the cross-validation worker processes
+_X = None
+_y = None
+_settings = None
+
+
+def _init_worker(filepath_X, filepath_Y, delimiter, threads, settings):
+    global _X, _y, _settings
+    # Each worker only uses its share of the CPU threads
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+    _X = load_array(filepath_X, delimiter)
+    _y = load_array(filepath_Y, delimiter)
+    _settings = settings
+
+
+def train_fold(fold: int, train_end: int, validation_start: int, validation_end: int):
+    """
+    Train one cross-validation fold inside a worker process
+
+    Returns the fold validation metrics
+    """
+    settings = _settings
+    X_train, y_train = _X[:train_end], _y[:train_end]
+    X_val = _X[validation_start:validation_end]
+    y_val = _y[validation_start:validation_end]
+
+    model = build_model(
+        settings["n_steps_in"],
+        settings["n_steps_out"],
+        X_train.shape[2],
+        settings["n_neurons"],
+    )
+    start = time.perf_counter()
+    train_model(
         X_train,
         y_train,
-        epochs=1000,
-        validation_data=(X_test, y_test),
-        callbacks=[checkpointer, sch, early_stop],
+        X_val,
+        y_val,
+        model,
+        f"lstm_model_fold{fold}.h5",
+        batch_size=settings["batch_size"],
+        epochs=settings["epochs"],
+        time_budget=settings["time_budget"],
+        metrics_path=f"lstm_training_metrics_fold{fold}.json",
+        verbose=2,
     )
+    train_time = time.perf_counter() - start
+    with open(f"lstm_training_metrics_fold{fold}.json") as f:
+        epochs_run = json.load(f)["epochs_run"]
 
-    return model
+    # Errors of the best weights on the scaled validation targets
+    model.load_weights(f"lstm_model_fold{fold}.h5")
+    errors = model.predict(np.asarray(X_val), verbose=0)[..., 0] - np.asarray(y_val)
+    return {
+        "fold": fold,
+        "train_windows": train_end,
+        "validation_start": validation_start,
+        "epochs": epochs_run,
+        "train_time": train_time,
+        "RMSE": math.sqrt(np.mean(errors**2)),
+        "MAE": np.mean(np.abs(errors)),
+        "RMSE last step": math.sqrt(np.mean(errors[:, -1] ** 2)),
+    }
+
+
+def cross_validate(
+    filepath_X: str,
+    filepath_Y: str,
+    delimiter: str,
+    folds,
+    workers: int,
+    settings: dict,
+) -> pd.DataFrame:
+    """
+    Train the rolling origin folds in parallel worker processes
+
+    Returns one row of metrics per fold, followed by their mean and std
+    """
+    threads = max(1, available_cpus() // workers)
+    # TensorFlow does not support forking a process where it already started
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(filepath_X, filepath_Y, delimiter, threads, settings),
+    ) as executor:
+        results = list(executor.map(train_fold, range(len(folds)), *zip(*folds)))
+
+    fold_metrics = pd.DataFrame(results).set_index("fold")
+    report = pd.concat([fold_metrics, fold_metrics.agg(["mean", "std"])])
+    report.index.name = "fold"
+    return report
 
 
 def lstm_build_model(
-    filepath_X: str = typer.Option(..., help="File path of X csv file"),
-    filepath_Y: str = typer.Option(..., help="File path of Y csv file"),
+    filepath_X: str = typer.Option(
+        ..., help="File path of the X windows, a memory-mapped .npy file"
+    ),
+    filepath_Y: str = typer.Option(
+        ..., help="File path of the Y target windows, a .npy, .npz or csv file"
+    ),
     n_neurons: int = typer.Option(
         200, help="Select number of neurons for model building"
     ),
@@ -64,6 +340,24 @@ def lstm_build_model(
     delimiter: str = typer.Option(
         ..., help="Delimiter of the input file and output file. Must be the same"
     ),
+    batch_size: int = typer.Option(32, help="Number of windows per training batch"),
+    epochs: int = typer.Option(1000, help="Maximum number of training epochs"),
+    time_budget: float = typer.Option(
+        0,
+        help="Seconds of training after which no new epoch is started, 0 for no limit",
+    ),
+    metrics_file: str = typer.Option(
+        "lstm_training_metrics.json",
+        help="JSON file with the epoch time, samples per second and peak memory of the training",
+    ),
+    cv_folds: int = typer.Option(
+        0,
+        help="Number of rolling origin cross-validation folds trained before the model, 0 to skip it",
+    ),
+    cv_workers: int = typer.Option(
+        available_cpus(),
+        help="Number of processes training cross-validation folds at the same time, sharing the CPU threads",
+    ),
 ):
     """
     Given some parameters, builds a ConvLSTM model for timeseries analysis.
@@ -72,9 +366,9 @@ def lstm_build_model(
     """
     os.chdir("data")
 
-    # Load array
-    X = load(filepath_X)
-    y = loadtxt(filepath_Y, delimiter=delimiter)
+    # Load arrays, windows are read from disk batch by batch while training
+    X = load_array(filepath_X, delimiter)
+    y = load_array(filepath_Y, delimiter)
 
     # Split train and test
     X_train, y_train, X_test, y_test = split_train_test(X, y, n_steps_out)
@@ -82,32 +376,48 @@ def lstm_build_model(
     # extract the number of features
     n_features = X_train.shape[2]
 
-    # Build LSTM MODEL
-    model = Sequential()
-    model.add(
-        Conv1D(
-            filters=64,
-            kernel_size=3,
-            activation="relu",
-            input_shape=(n_steps_in, n_features),
+    if cv_folds > 0:
+        folds = rolling_origin_folds(len(X), cv_folds, n_steps_out)
+        settings = {
+            "n_steps_in": n_steps_in,
+            "n_steps_out": n_steps_out,
+            "n_neurons": n_neurons,
+            "batch_size": batch_size,
+            "epochs": epochs,
+            "time_budget": time_budget,
+        }
+        cv_metrics = cross_validate(
+            filepath_X,
+            filepath_Y,
+            delimiter,
+            folds,
+            min(cv_workers, cv_folds),
+            settings,
         )
-    )
-    model.add(Conv1D(filters=64, kernel_size=3, activation="relu"))
-    model.add(MaxPooling1D(pool_size=2))
-    model.add(Flatten())
-
-    model.add(RepeatVector(n_steps_out))
-    model.add(LSTM(n_neurons, activation="relu", return_sequences=True))
-    model.add(TimeDistributed(Dense(n_neurons, activation="relu")))
-    model.add(TimeDistributed(Dense(1)))
+        cv_metrics.to_csv(
+            Path("", "lstm_cv_metrics").with_suffix(".csv"), sep=delimiter
+        )
+        print(cv_metrics)
 
-    model.compile(loss="mse", optimizer="adam", metrics=[metric.RootMeanSquaredError()])
+    # Build LSTM MODEL
+    model = build_model(n_steps_in, n_steps_out, n_features, n_neurons)
     model.summary()
 
     # Train and Save the model
     dirname = ""
     saved_model = dirname + "lstm_model.h5"
-    train_model(X_train, y_train, X_test, y_test, model, saved_model)
+    train_model(
+        X_train,
+        y_train,
+        X_test,
+        y_test,
+        model,
+        saved_model,
+        batch_size=batch_size,
+        epochs=epochs,
+        time_budget=time_budget,
+        metrics_path=metrics_file,
+    )
 
     # Save numpy array
     dirname = ""
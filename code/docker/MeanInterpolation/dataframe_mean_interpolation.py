@@ -1,5 +1,4 @@
 import os
-from datetime import datetime
 from pathlib import Path
 from typing import List
 
@@ -9,22 +8,26 @@ import typer
 
 
 # =========== METHODS ============
-def date_range(start, end):
-    """[summary]
+def climatology(data: pd.DataFrame, initial_year: int, final_year: int):
+    """Daily climatology of the dataset
 
     Args:
-        start ([datetime]): [initial date]
-        end ([datetime]): [final date]
+        data ([DataFrame]): [dataset with a datetime "fecha" column]
+        initial_year ([int]): [first year used for the means]
+        final_year ([int]): [last year used for the means]
 
     Returns:
-        Date Range between start and end date
+        Mean of every numeric column per (month, day), rounded to 2 decimals
     """
-    date_list = []
-    curr_date = start
-    while curr_date <= end:
-        date_list.append(curr_date)
-        curr_date = curr_date.replace(year=curr_date.year + 1)
-    return date_list
+    fecha = data["fecha"]
+    columns = data.drop(columns="fecha").select_dtypes("number").columns
+    in_range = fecha.dt.year.between(initial_year, final_year)
+    return (
+        data.loc[in_range, columns]
+        .groupby([fecha[in_range].dt.month, fecha[in_range].dt.day])
+        .mean()
+        .round(2)
+    )
 
 
 def dataframe_interpolation(
@@ -39,23 +42,15 @@ def dataframe_interpolation(
 
     data = pd.read_csv(filepath, sep=delimiter, parse_dates=[date_column])
     data = data.rename(columns={date_column: "fecha"})
-    nan_values = data[data.isna().any(axis=1)]
+    data["fecha"] = pd.to_datetime(data["fecha"], format="%Y-%m-%d")
 
-    for row in nan_values.itertuples():
-        for column in nan_values.columns:
-            if pd.isna(getattr(row, column)):
-                row_fecha = row.fecha
-                if type(row.fecha) == str:
-                    row_fecha = datetime.strptime(row_fecha, "%Y-%m-%d")
-                day, month = row_fecha.day, row_fecha.month
-                subset = date_range(
-                    start=datetime(initial_year, month, day),
-                    end=datetime(final_year, month, day),
-                )
-                mean = round(
-                    data.loc[data["fecha"].isin(subset)][column].mean(skipna=True), 2
-                )
-                data.at[row.Index, column] = mean
+    # Mean of every (month, day) between initial_year and final_year,
+    # looked up once for all the rows and used to fill the gaps
+    means = climatology(data, initial_year, final_year)
+    daily_means = means.reindex(
+        pd.MultiIndex.from_arrays([data["fecha"].dt.month, data["fecha"].dt.day])
+    ).set_index(data.index)
+    data[means.columns] = data[means.columns].fillna(daily_means)
 
     data = data.rename(columns={"fecha": date_column})
 
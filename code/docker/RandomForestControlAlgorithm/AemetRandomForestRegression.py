@@ -1,57 +1,130 @@
 import math
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import List, Optional
 
+import numpy as np
 import pandas as pd
 import typer
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from sklearn.model_selection import TimeSeriesSplit
 
+# CPU count shared with the other components running parallel workers
+from cpus import available_cpus
+
+METRICS = ("r2", "mae", "rmse", "rmse_mae")
+
+# Candidate datasets shared by the folds of a worker process, set by _init_worker
+_datasets = None
+_forest = None
+
 
 # ========== METHODS ==========
+def _init_worker(datasets, forest):
+    global _datasets, _forest
+    _datasets, _forest = datasets, forest
+
+
+def fold_metrics(dataset, train_index, test_index):
+    X, y = _datasets[dataset]
+    X_train, X_test = X[train_index], X[test_index]
+    y_train, y_test = y[train_index], y[test_index]
+    reg = RandomForestRegressor(**_forest).fit(X_train, y_train)
+    y_predict = reg.predict(X_test)
+    r2 = r2_score(y_test, y_predict)
+    mae = mean_absolute_error(y_test, y_predict)
+    rmse = math.sqrt(mean_squared_error(y_test, y_predict))
+    if mae != 0:
+        rmse_mae = rmse / mae
+    else:
+        rmse_mae = rmse
+    return r2, mae, rmse, rmse_mae
+
+
+def cross_validate(datasets, n_splits=5, n_estimators=100, n_jobs=1, workers=1):
+    # METRICS of every TimeSeriesSplit fold of every (X, y) candidate, with shape
+    # (candidates, folds, metrics). The folds of all the candidates share one pool
+    forest = {"n_estimators": n_estimators, "n_jobs": n_jobs}
+    tscv = TimeSeriesSplit(n_splits=n_splits)
+    tasks = [
+        (dataset, fold, train_index, test_index)
+        for dataset, (X, _) in enumerate(datasets)
+        for fold, (train_index, test_index) in enumerate(tscv.split(X))
+    ]
+    metrics = np.empty((len(datasets), n_splits, len(METRICS)))
+
+    workers = max(1, min(workers, len(tasks)))
+    if workers == 1:
+        _init_worker(datasets, forest)
+        for dataset, fold, train_index, test_index in tasks:
+            metrics[dataset, fold] = fold_metrics(dataset, train_index, test_index)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(datasets, forest)
+        ) as executor:
+            dataset_ids, folds, train_indexes, test_indexes = zip(*tasks)
+            rows = executor.map(fold_metrics, dataset_ids, train_indexes, test_indexes)
+            for dataset, fold, row in zip(dataset_ids, folds, rows):
+                metrics[dataset, fold] = row
+
+    return metrics
+
+
+def read_dataset(filepath, delimiter, date_column, dependent_variable):
+    df = pd.read_csv(filepath, sep=delimiter)
+    df = df.set_index(date_column)
+    df = df.dropna(axis=0, how="any")
+    X = df.drop(dependent_variable, axis=1).to_numpy()
+    y = df[dependent_variable].to_numpy()
+    return X, y
+
+
 def aemet_linear_regression(
-    filepath: str = typer.Option(..., help="Path of csv file"),
+    filepath: List[str] = typer.Option(
+        ...,
+        help="Path of csv file. Repeat the option to score several candidate files in one run",
+    ),
     delimiter: str = typer.Option(..., help="Delimiter of the csv file"),
     date_column: str = typer.Option(..., help="Name of the date column"),
     dependent_variable: str = typer.Option(..., help="Name of the Pollen column"),
+    n_splits: int = typer.Option(5, help="Number of TimeSeriesSplit folds"),
+    n_estimators: int = typer.Option(100, help="Number of trees of each forest"),
+    n_jobs: int = typer.Option(
+        1, help="Number of jobs of each forest, -1 to use all the CPUs"
+    ),
+    workers: int = typer.Option(
+        available_cpus(), help="Number of folds fitted at the same time"
+    ),
+    outfile_name: Optional[str] = typer.Option(
+        None,
+        help="Name of the metrics csv file without extension, by default the name of the first file followed by _metrics",
+    ),
 ):
     os.chdir("data")
 
-    df = pd.read_csv(filepath, sep=delimiter)
-    df = df.set_index(date_column)
-    df = df.dropna(axis=0, how="any")
-    X = df.drop(dependent_variable, axis=1).to_numpy()
-    y = df[dependent_variable].to_numpy()
+    filepaths = list(dict.fromkeys(filepath))
+    datasets = [
+        read_dataset(path, delimiter, date_column, dependent_variable)
+        for path in filepaths
+    ]
 
-    metrics = pd.DataFrame()
-    final_df = pd.DataFrame()
-    tscv = TimeSeriesSplit()
-    for train_index, test_index in tscv.split(X):
-        X_train, X_test = X[train_index], X[test_index]
-        y_train, y_test = y[train_index], y[test_index]
-        reg = RandomForestRegressor().fit(X_train, y_train)
-        y_predict = reg.predict(X_test)
-        r2 = r2_score(y_test, y_predict)
-        mae = mean_absolute_error(y_test, y_predict)
-        rmse = math.sqrt(mean_squared_error(y_test, y_predict))
-        if mae != 0:
-            rmse_mae = rmse / mae
-        else:
-            rmse_mae = rmse
-        dict = {"r2": r2, "mae": mae, "rmse": rmse, "rmse_mae": rmse_mae}
-        metrics = metrics.append(dict, ignore_index=True)
-    final_dict = {
-        "filename": Path(filepath).stem,
-        "r2_mean": metrics["r2"].mean(),
-        "mae_mean": metrics["mae"].mean(),
-        "rmse_mean": metrics["rmse"].mean(),
-        "rmse_mae_mean": metrics["rmse_mae"].mean(),
-    }
-    final_df = final_df.append(final_dict, ignore_index=True)
+    # One row per candidate, in the order of the files
+    metrics = cross_validate(datasets, n_splits, n_estimators, n_jobs, workers)
+    means = metrics.mean(axis=1)
+    final_df = pd.DataFrame(
+        {
+            "filename": [Path(path).stem for path in filepaths],
+            "r2_mean": means[:, 0],
+            "mae_mean": means[:, 1],
+            "rmse_mean": means[:, 2],
+            "rmse_mae_mean": means[:, 3],
+        }
+    )
 
     dirname = ""
-    filename = Path(filepath).stem + "_metrics"
+    filename = outfile_name or Path(filepaths[0]).stem + "_metrics"
     extension = ".csv"
 
     path = Path(dirname, filename).with_suffix(extension)
@@ -3,11 +3,16 @@ import os
 from pathlib import Path
 
 import joblib
+import numpy as np
 import pandas as pd
+import statsmodels.api as sm
 import typer
 from numpy import ndarray, savetxt
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
+# Series digest shared with the other SARIMA components
+from sarimax_search import series_digest
+
 
 def compute_metrics(test: ndarray, pred: ndarray) -> dict:
     """
@@ -22,6 +27,38 @@ def compute_metrics(test: ndarray, pred: ndarray) -> dict:
     return {"MAE": mae_lstm, "RMSE": rmse_lstm, "R2 Score": r2_lstm}
 
 
+def load_sarima_model(filepath_model: str, y: pd.DataFrame, X: pd.DataFrame):
+    """
+    Rebuild the fitted SARIMA model from the compact model file of sarima_model
+    and the data it was trained on. Full results pickles are returned as they are
+
+    Returns the SARIMAX results
+    """
+    artifact = joblib.load(filepath_model)
+    if not isinstance(artifact, dict):
+        return artifact
+
+    if artifact["nobs"] != len(y):
+        raise ValueError(
+            f"{filepath_model} was fitted on {artifact['nobs']} observations, "
+            f"got {len(y)}"
+        )
+    # The parameters only apply to the series and exogenous variables of the fit
+    if series_digest(y, X).hexdigest() != artifact["digest"]:
+        raise ValueError(
+            f"{filepath_model} was fitted on a different series or exogenous matrix"
+        )
+    model = sm.tsa.statespace.SARIMAX(
+        endog=y,
+        exog=X,
+        order=tuple(artifact["order"]),
+        seasonal_order=tuple(artifact["seasonal_order"]),
+        **artifact["flags"],
+    )
+    # One pass of the Kalman filter, no optimization
+    return model.filter(np.asarray(artifact["params"]))
+
+
 def sarima_evaluation(
     filepath_X: str = typer.Option(..., help="File path of X_test csv file"),
     filepath_Y: str = typer.Option(..., help="File path of Y_test csv file"),
@@ -40,16 +77,16 @@ def sarima_evaluation(
     """
     os.chdir("data")
 
-    # Read X,Y
-    X = pd.read_csv(filepath_X, sep=delimiter)
+    # Read X,Y, exactly as sarima_model wrote them so the model digest matches
+    X = pd.read_csv(filepath_X, sep=delimiter, float_precision="round_trip")
     X["date"] = pd.to_datetime(X["date"])
     X = X.set_index("date")
 
-    y = pd.read_csv(filepath_Y, sep=delimiter)
+    y = pd.read_csv(filepath_Y, sep=delimiter, float_precision="round_trip")
     y["date"] = pd.to_datetime(y["date"])
     y = y.set_index("date")
 
-    load_model = joblib.load(filepath_model)
+    load_model = load_sarima_model(filepath_model, y, X)
 
     # prediction = load_model.get_prediction(start=-15, dynamic=False)
     prediction = load_model.get_prediction(
@@ -1,13 +1,30 @@
+import csv
 import os
-from itertools import product
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product, repeat
 from pathlib import Path
+from typing import Optional
 
 import joblib
 import pandas as pd
-import statsmodels.api as sm
 import typer
 from numpy import savetxt
 
+# CPU count shared with the other components running parallel workers
+from cpus import available_cpus
+
+# SARIMAX fitting and order search shared with the other SARIMA components
+from sarimax_search import (
+    OrderSearch,
+    SarimaxFitCache,
+    _init_worker,
+    fit_aic,
+    fit_sarimax,
+    start_entry,
+    stepwise_search,
+    warm_start_candidates,
+)
+
 
 def parameter_configuration():
     ps = [0, 1, 2]
@@ -23,41 +40,83 @@ def parameter_configuration():
     return parameters_list
 
 
-def optimizeSARIMA(df, parameters_list, s):
+def compact_model(results):
+    """Model file content: the fit specification and parameters, without the
+    training data, filter output and covariance matrices of the results object"""
+    return {**start_entry(results), "aic": float(results.aic)}
+
+
+def print_timeouts(timeouts, timeout, workers):
+    # Fits stopped by the wall clock timeout are not failures of the order, the
+    # search result depends on the machine load when there are any
+    if timeouts:
+        print(
+            f"Warning: {timeouts} SARIMA fits exceeded the {timeout} s fit timeout "
+            f"with {workers} workers on {available_cpus()} CPUs and were skipped, "
+            "raise --fit-timeout or lower --workers to fit them"
+        )
+
+
+def optimizeSARIMA(
+    df,
+    parameters_list,
+    s,
+    workers=1,
+    timeout=0,
+    table_path=None,
+    delimiter=";",
+    cache_dir=None,
+    start_candidates=None,
+):
     """Return dataframe with parameters and corresponding AIC
 
-    parameters_list - list with (p, q, P, Q) tuples
-    d - integration order in ARIMA model
-    D - seasonal integration order
+    parameters_list - list with (p, d, q, P, D, Q) tuples
     s - length of season
+    workers - number of processes fitting models at the same time
+    timeout - seconds allowed per fit, 0 for no limit
+    table_path - CSV file where each AIC is appended as soon as its fit completes
+    cache_dir - directory of the SARIMAX fit cache, None to always fit
+    start_candidates - previous fits warm starting the optimizer
     """
 
     results = []
-    best_aic = float("inf")
-
-    for param in parameters_list:
-        # we need try-except because on some combinations model fails to converge
-        try:
-            model = sm.tsa.statespace.SARIMAX(
-                endog=df["pollen"],
-                exog=df.drop(["pollen"], axis=1),
-                order=(param[0], param[1], param[2]),
-                seasonal_order=(param[3], param[4], param[5], s),
-                enforce_stationarity=False,
-                enforce_invertibility=False,
-            ).fit(disp=False)
-        except:
-            continue
-        aic = model.aic
-        # saving best model, AIC and parameters
-        if aic < best_aic:
-            best_model = model
-            best_aic = aic
-            best_param = param
-        results.append([best_param, best_model.aic])
-
-    result_table = pd.DataFrame(results)
-    result_table.columns = ["parameters", "aic"]
+    timeouts = 0
+    table_file = open(table_path, "w", newline="") if table_path else None
+    try:
+        if table_file:
+            table = csv.writer(table_file, delimiter=delimiter)
+            table.writerow(["parameters", "aic"])
+
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(
+                df["pollen"],
+                df.drop(["pollen"], axis=1),
+                cache_dir,
+                start_candidates,
+            ),
+        ) as executor:
+            futures = [
+                executor.submit(fit_aic, param, s, timeout) for param in parameters_list
+            ]
+            for future in as_completed(futures):
+                param, aic, _, timed_out = future.result()
+                timeouts += timed_out
+                if aic is None:
+                    continue
+                results.append([param, aic])
+                if table_file:
+                    table.writerow([param, aic])
+                    table_file.flush()
+    finally:
+        if table_file:
+            table_file.close()
+
+    print(f"{len(results)} of {len(parameters_list)} SARIMA fits completed")
+    print_timeouts(timeouts, timeout, workers)
+
+    result_table = pd.DataFrame(results, columns=["parameters", "aic"])
     # sorting in ascending order, the lower AIC is - the better
     result_table = result_table.sort_values(by="aic", ascending=True).reset_index(
         drop=True
@@ -66,14 +125,104 @@ def optimizeSARIMA(df, parameters_list, s):
     return result_table
 
 
+def stepwiseSARIMA(
+    df,
+    s,
+    workers=1,
+    timeout=0,
+    partial_maxiter=10,
+    keep=0.5,
+    cache_dir=None,
+    start_candidates=None,
+):
+    """Return dataframe with the orders fitted by a stepwise search and their AIC
+
+    The search starts from a few seed orders and only explores the neighbours of
+    the best order found so far, see stepwise_search
+    """
+    seeds = [
+        (1, 0, 0, 0, 1, 0),
+        (2, 0, 2, 1, 1, 1),
+        (0, 0, 0, 0, 1, 0),
+        (1, 0, 0, 1, 1, 0),
+        (0, 0, 1, 0, 1, 1),
+    ]
+    bounds = [(0, 2), (0, 1), (0, 3), (0, 2), (0, 1), (0, 3)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            df["pollen"],
+            df.drop(["pollen"], axis=1),
+            cache_dir,
+            start_candidates,
+        ),
+    ) as executor:
+        timeouts = 0
+
+        def evaluate(parameters_list, maxiter, start_params):
+            nonlocal timeouts
+            results = []
+            for _, aic, params, timed_out in executor.map(
+                fit_aic,
+                parameters_list,
+                repeat(s),
+                repeat(timeout),
+                repeat(maxiter),
+                start_params,
+            ):
+                timeouts += timed_out
+                results.append((aic, params))
+            return results
+
+        result_table, full_fits, partial_fits = stepwise_search(
+            evaluate, seeds, bounds, partial_maxiter, keep
+        )
+
+    grid_fits = len(parameter_configuration())
+    best_aic = result_table.aic[0] if len(result_table) > 0 else float("nan")
+    print(
+        f"Stepwise SARIMA search: {full_fits} full and {partial_fits} partial fits "
+        f"instead of {grid_fits} grid fits, best AIC {best_aic:.3f}"
+    )
+    print_timeouts(timeouts, timeout, workers)
+
+    return result_table
+
+
 def sarima_model(
     filepath: str = typer.Option(..., help="File path of the pollen csv file"),
     delimiter: str = typer.Option(
         ..., help="Delimiter of the input file and output file. Must be the same"
     ),
     seasonality: int = typer.Option(..., help="Indicate seasonality"),
+    optimize: bool = typer.Option(
+        False, help="Select the SARIMA order with the lowest AIC"
+    ),
+    search: OrderSearch = typer.Option(
+        OrderSearch.grid,
+        help="Order search of --optimize: grid (every order) or stepwise (neighbours of the best order, only the best ranked short fits are resumed to a full fit)",
+    ),
+    workers: int = typer.Option(
+        available_cpus(),
+        help="Number of processes for the grid search, by default the CPUs available to the process",
+    ),
+    fit_timeout: float = typer.Option(
+        60, help="Seconds allowed per grid search fit, 0 for no limit"
+    ),
+    cache_dir: Optional[str] = typer.Option(
+        None,
+        help="Directory of the SARIMAX fit cache reused by reruns on the same data, disabled if not set",
+    ),
+    warm_start: bool = typer.Option(
+        False,
+        help="Seed the SARIMAX fits with the parameters of the same orders in the previous model file or the fit cache, when they were fitted on a prefix of the series",
+    ),
+    previous_model: str = typer.Option(
+        "Sarima_model.pkl", help="Model file of the previous run used by --warm-start"
+    ),
 ):
-
     """
     Train SARIMA model with a specific scaled dataset
     Return a trained SARIMA model and X_test, y_test for evaluation metrics
@@ -89,23 +238,75 @@ def sarima_model(
     Y = dataframe[["pollen"]]
     X = dataframe.drop(["pollen"], axis=1)
 
-    # Set configuration parameters for SARIMA hyperparameter optimization
-    # parameters_list = parameter_configuration()
-    # result_table = optimizeSARIMA(dataframe, parameters_list, seasonality, pollen)
+    cache = SarimaxFitCache(cache_dir) if cache_dir else None
+
+    # Previous fits on a prefix of the series seed the optimizer
+    start_candidates = None
+    if warm_start:
+        entries = []
+        if Path(previous_model).is_file():
+            previous = joblib.load(previous_model)
+            # Full results pickles of earlier versions are also accepted
+            entries.append(
+                previous if isinstance(previous, dict) else start_entry(previous)
+            )
+        if cache:
+            entries.extend(cache.start_entries())
+        start_candidates = warm_start_candidates(
+            entries, Y, X, enforce_stationarity=False, enforce_invertibility=False
+        )
+        print(f"Warm start from {len(start_candidates)} previous SARIMA fits")
 
-    # set the best parameters that give the lowest AIC
-    # p,d, q, P, D, Q = result_table.parameters[0]
     p, d, q, P, D, Q = 1, 0, 0, 0, 1, 0
+    if optimize:
+        path_table = Path("", "Sarima_aic_table").with_suffix(".csv")
+        if search is OrderSearch.stepwise:
+            result_table = stepwiseSARIMA(
+                dataframe,
+                seasonality,
+                workers=workers,
+                timeout=fit_timeout,
+                cache_dir=cache_dir,
+                start_candidates=start_candidates,
+            )
+        else:
+            # Set configuration parameters for SARIMA hyperparameter optimization
+            parameters_list = parameter_configuration()
+            result_table = optimizeSARIMA(
+                dataframe,
+                parameters_list,
+                seasonality,
+                workers=workers,
+                timeout=fit_timeout,
+                table_path=path_table,
+                delimiter=delimiter,
+                cache_dir=cache_dir,
+                start_candidates=start_candidates,
+            )
+        result_table.to_csv(path_table, sep=delimiter, index=False)
+
+        if result_table.empty:
+            raise ValueError(
+                f"No SARIMA fit of the {search.value} search converged, see {path_table}"
+            )
+        # set the best parameters that give the lowest AIC
+        p, d, q, P, D, Q = result_table.parameters[0]
 
     # With the best parameters we will train de the best model
-    best_model = sm.tsa.statespace.SARIMAX(
-        endog=Y,
-        exog=X,
-        order=(p, d, q),
-        seasonal_order=(P, D, Q, seasonality),
+    best_model = fit_sarimax(
+        cache,
+        Y,
+        X,
+        (p, d, q),
+        (P, D, Q, seasonality),
+        start_candidates=start_candidates,
         enforce_stationarity=False,
         enforce_invertibility=False,
-    ).fit(disp=False)
+    )
+    # Models rebuilt from the cache have no optimizer results
+    mle_retvals = getattr(best_model, "mle_retvals", None)
+    if mle_retvals:
+        print(f"SARIMA model fitted in {mle_retvals.get('iterations')} iterations")
     # Outfile
     dirname = ""
     filename = "Sarima_model"
@@ -113,7 +314,9 @@ def sarima_model(
     path = Path(dirname, filename).with_suffix(suffix)
 
     ### Save Model ###
-    joblib.dump(best_model, path)
+    # Only the specification and the parameters are saved, the fit is rebuilt
+    # from them and the test data by sarima_evaluation
+    joblib.dump(compact_model(best_model), path)
 
     # Save numpy array as CSV
     dirname = ""
@@ -1,9 +1,13 @@
 import os
 from pathlib import Path
+from typing import List
 
 import pandas as pd
 import typer
 
+# Monthly aggregation shared with the Seasonality component
+from monthly_aggregation import monthly_aggregate, parse_aggregation
+
 
 def scale_by_months(
     filepath: str = typer.Option(..., help="File path of the csv file"),
@@ -11,6 +15,11 @@ def scale_by_months(
         ..., help="Delimiter of the input file and output file. Must be the same"
     ),
     date_column: str = typer.Option(..., help="Name of the date column"),
+    aggregation: List[str] = typer.Option(
+        [],
+        help="Aggregation of a column as column:function, function being sum, mean or max. "
+        "Repeat the option for several columns, the others are summed",
+    ),
 ):
     """
     Given a Pollen Dataframe by days, it is scaled to months.
@@ -24,19 +33,11 @@ def scale_by_months(
     # Rename date column to keep it in the entire workflow
     dataframe = dataframe.rename(columns={date_column: "date"})
 
-    dataframe["date"] = pd.to_datetime(dataframe["date"])
-    dataframe["date"] = dataframe["date"].dt.to_period("M")
-    dates = dataframe["date"].unique()
-    df_month = pd.DataFrame()
-    df_month["date"] = dates
-    df_month = df_month.set_index("date")
-
-    dataframe_aux = dataframe.drop(["date"], axis=1)
-
-    for date in dates:
-        df_month.loc[date, dataframe_aux.columns] = dataframe.loc[
-            dataframe["date"] == date, dataframe_aux.columns
-        ].sum()
+    # Sum every column by month, unless --aggregation says otherwise
+    value_columns = [column for column in dataframe.columns if column != "date"]
+    df_month = monthly_aggregate(
+        dataframe, "date", parse_aggregation(aggregation, value_columns)
+    )
 
     # Save Outfile
     dirname = ""
@@ -4,6 +4,7 @@ import itertools
 import os
 import warnings
 from time import time
+from typing import Optional
 
 import matplotlib
 import matplotlib.dates as mdates
@@ -16,7 +17,6 @@ from matplotlib import pyplot
 plt.style.use("fivethirtyeight")
 # statsmodels
 import statsmodels.api as sm
-import statsmodels.api as sma
 # Typer
 import typer
 from pylab import rcParams
@@ -25,6 +25,20 @@ from scipy.signal import find_peaks
 from sklearn.metrics import mean_squared_error
 from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
 from statsmodels.tsa.stattools import adfuller
+from threadpoolctl import threadpool_limits
+
+# Monthly aggregation shared with the Scale By Months component
+from monthly_aggregation import monthly_aggregate
+
+# SARIMAX fitting and order search shared with the SARIMA Model component
+from sarimax_search import (
+    OrderSearch,
+    SarimaxFitCache,
+    _set_fit_state,
+    fit_aic,
+    fit_sarimax,
+    stepwise_search,
+)
 
 warnings.filterwarnings("ignore")
 
@@ -111,7 +125,7 @@ def decompose(data, year, dfuller):
     end_df.to_csv("DickerFuller_seasonality.csv", sep=";")
 
 
-def arimax(data):
+def arimax(data, search="grid", cache_dir=None):
     p = q = range(0, 3)
     d = range(0, 1)
     P = Q = range(0, 3)
@@ -119,35 +133,65 @@ def arimax(data):
 
     pdq = list(itertools.product(p, d, q))
     seasonal_pdq = [(x[0], x[1], x[2], 12) for x in list(itertools.product(P, D, Q))]
+    grid_fits = len(pdq) * len(seasonal_pdq)
     warnings.filterwarnings("ignore")
-    min_aic = 9999999
-    for param in pdq:
-        for param_seasonal in seasonal_pdq:
-            try:
-                mod = sma.tsa.statespace.SARIMAX(
-                    data,
-                    order=param,
-                    seasonal_order=param_seasonal,
-                    enforce_stationarity=False,
-                    enforce_invertibility=False,
-                )
-                results = mod.fit(disp=False)
-                if results.aic < min_aic:
-                    min_aic = results.aic
-                    parameter = param
-                    parameter_seasonal = param_seasonal
-
-            except:
-                continue
-
-    mod = sma.tsa.statespace.SARIMAX(
+    # Orders are fitted one at a time in this process, BLAS threads are only
+    # limited during the search and not for the rest of the component
+    _set_fit_state(data, None, cache_dir)
+
+    with threadpool_limits(1):
+        if search == "stepwise":
+            seeds = [
+                (1, 0, 0, 0, 0, 0),
+                (2, 0, 2, 1, 0, 1),
+                (0, 0, 0, 0, 0, 0),
+                (1, 0, 0, 1, 0, 0),
+                (0, 0, 1, 0, 0, 1),
+            ]
+            bounds = [(0, 2), (0, 0), (0, 2), (0, 2), (0, 0), (0, 2)]
+            result_table, full_fits, partial_fits = stepwise_search(
+                lambda params, maxiter, start_params: [
+                    fit_aic(param, 12, maxiter=maxiter, start_params=start)[1:3]
+                    for param, start in zip(params, start_params)
+                ],
+                seeds,
+                bounds,
+            )
+        else:
+            full_fits, partial_fits = grid_fits, 0
+            results = []
+            for param in pdq:
+                for param_seasonal in seasonal_pdq:
+                    order, aic, _, _ = fit_aic(param + param_seasonal[:3], 12)
+                    if aic is not None:
+                        results.append([order, aic])
+            result_table = pd.DataFrame(results, columns=["parameters", "aic"])
+            result_table = result_table.sort_values(
+                by="aic", kind="stable"
+            ).reset_index(drop=True)
+
+    if result_table.empty:
+        raise ValueError(f"No SARIMAX fit of the {search} search converged")
+    best = result_table.parameters[0]
+    min_aic = result_table.aic[0]
+    parameter = best[:3]
+    parameter_seasonal = best[3:] + (12,)
+
+    print(
+        f"SARIMAX {search} search: {full_fits} full and {partial_fits} partial fits "
+        f"of a {grid_fits} order grid, best AIC {min_aic:.3f} with order "
+        f"{parameter}{parameter_seasonal}"
+    )
+
+    results = fit_sarimax(
+        SarimaxFitCache(cache_dir) if cache_dir else None,
         data,
-        order=parameter,
-        seasonal_order=parameter_seasonal,
+        None,
+        parameter,
+        parameter_seasonal,
         enforce_stationarity=True,
         enforce_invertibility=False,
     )
-    results = mod.fit(disp=False)
     results.plot_diagnostics(figsize=(16, 8))
     plt.savefig("SARIMAX_plots.pdf")
 
@@ -158,22 +202,21 @@ def arima(
     date_column: str = typer.Option(..., help="Name of the Date column"),
     pollen: str = typer.Option(..., help="Name of the Pollen column"),
     year: int = typer.Option(..., help="Year for decomposition"),
+    search: OrderSearch = typer.Option(
+        OrderSearch.grid,
+        help="SARIMAX order search: grid (every order) or stepwise (neighbours of the best order, only the best ranked short fits are resumed to a full fit)",
+    ),
+    cache_dir: Optional[str] = typer.Option(
+        None,
+        help="Directory of the SARIMAX fit cache reused by reruns on the same data, disabled if not set",
+    ),
 ):
     os.chdir("data")
-    dataframe = pd.read_csv(filepath, sep=delimiter)
-
-    df = pd.DataFrame()
-    df[date_column] = dataframe[date_column]
-    df[pollen] = dataframe[pollen]
-    df[date_column] = pd.to_datetime(df[date_column]).dt.strftime("%m-%Y")
-
-    dates = df[date_column].unique()
-    data = pd.DataFrame()
-    data[date_column] = dates
-    data = data.set_index(date_column)
+    dataframe = pd.read_csv(filepath, sep=delimiter, usecols=[date_column, pollen])
 
-    for date in dates:
-        data.loc[date, pollen] = df.loc[df[date_column] == date, pollen].sum()
+    # Monthly pollen sum
+    data = monthly_aggregate(dataframe, date_column)
+    data.index = data.index.to_timestamp()
 
     dfuller = test_stationarity(data[pollen])
 
@@ -181,7 +224,7 @@ def arima(
     decompose(data, year, dfuller)
 
     # SARIMAX
-    arimax(data)
+    arimax(data, search.value, cache_dir)
 
 
 if __name__ == "__main__":
@@ -3,19 +3,69 @@ from pathlib import Path
 
 import numpy as np
 import typer
-from numpy import loadtxt, save, savetxt
+from numpy import save
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Array files shared with the Data Normalization and LSTM Model components
+from array_files import OUTPUT_FORMATS, load_array, save_array
+
+
+def supervised_windows(sequences_x, sequences_y, n_steps_in, n_steps_out):
+    """
+    Supervised windows of a multidimensional array as strided views, without
+    copying each window. The last column of sequences_x is left out of X
+
+    Returns X with shape (windows, n_steps_in, features) and y with shape
+    (windows, n_steps_out, ...)
+    """
+    n_windows = max(len(sequences_x) - n_steps_in - n_steps_out + 2, 0)
+    features = sequences_x[:, :-1]
+    if n_windows == 0:
+        return (
+            np.empty((0, n_steps_in) + features.shape[1:], dtype=features.dtype),
+            np.empty((0, n_steps_out) + sequences_y.shape[1:], dtype=sequences_y.dtype),
+        )
+
+    # sliding_window_view appends the window axis, move it after the window index
+    X = np.moveaxis(sliding_window_view(features, n_steps_in, axis=0), -1, 1)
+    y = np.moveaxis(
+        sliding_window_view(sequences_y[n_steps_in - 1 :], n_steps_out, axis=0), -1, 1
+    )
+    return X[:n_windows], y[:n_windows]
+
+
+def save_windows(path, X, batch_size=64):
+    """
+    Same file as np.save, copying only batch_size windows at a time from the
+    strided view
+    """
+    with open(path, "wb") as f:
+        np.lib.format.write_array_header_1_0(
+            f, np.lib.format.header_data_from_array_1_0(X)
+        )
+        for start in range(0, len(X), batch_size):
+            f.write(memoryview(np.ascontiguousarray(X[start : start + batch_size])))
 
 
 def split_sequences_multivariable(
     filepath_features: str = typer.Option(
-        ..., help="File path of the features csv file"
+        ..., help="File path of the features csv, npy or npz file"
+    ),
+    filepath_target: str = typer.Option(
+        ..., help="File path of the target csv, npy or npz file"
     ),
-    filepath_target: str = typer.Option(..., help="File path of the target csv file"),
     n_steps_in: int = typer.Option(..., help="Select time window to train the model"),
     n_steps_out: int = typer.Option(..., help="Select period of time to predict"),
     delimiter: str = typer.Option(
         ..., help="Delimiter of the input file and output file. Must be the same"
     ),
+    materialize: bool = typer.Option(
+        False,
+        help="Copy all the windows into one array before saving them, instead of writing the strided views in batches",
+    ),
+    output_format: str = typer.Option(
+        "csv", help="Format of the sequences_Y target windows: csv, npy or npz"
+    ),
 ):
     """
     Generates supervised data from a multidimensional array.
@@ -23,39 +73,37 @@ def split_sequences_multivariable(
     Returns both data and its target for supervised learning
     """
 
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}")
+
     os.chdir("data")
 
-    # Load array from CSV
-    sequences_x = loadtxt(filepath_features, delimiter=delimiter)
-    sequences_y = loadtxt(filepath_target, delimiter=delimiter)
-
-    X, y = list(), list()
-    for i in range(len(sequences_x)):
-        # find the end of this pattern
-        end_ix = i + n_steps_in
-        out_end_ix = end_ix + n_steps_out - 1
-        # check if we are beyond the dataset
-        if out_end_ix > len(sequences_x):
-            break
-        # gather input and output parts of the pattern
-        seq_x, seq_y = sequences_x[i:end_ix, :-1], sequences_y[end_ix - 1 : out_end_ix]
-        X.append(seq_x)
-        y.append(seq_y)
-
-    X = np.array(X)
-    y = np.array(y)
+    # Load arrays, the file extension tells the format
+    sequences_x = load_array(filepath_features, delimiter)
+    sequences_y = load_array(filepath_target, delimiter)
+    # loadtxt reads a single column as a 1-D array, same for binary targets
+    if sequences_y.ndim == 2 and sequences_y.shape[1] == 1:
+        sequences_y = sequences_y[:, 0]
+
+    X, y = supervised_windows(sequences_x, sequences_y, n_steps_in, n_steps_out)
+    if materialize:
+        # Contiguous copy holding every window in memory
+        X = np.ascontiguousarray(X)
 
     # Save numpy array
     dirname = ""
     filename = "sequences_X"
     filename_target = "sequences_Y"
-    suffix = ".csv"
+    suffix = "." + output_format
     path = Path(dirname, filename)
     path_target = Path(dirname, filename_target).with_suffix(suffix)
 
     # savetxt(path, X, delimiter=delimiter)
-    save(path, X)
-    savetxt(path_target, y, delimiter=delimiter)
+    if materialize:
+        save(path, X)
+    else:
+        save_windows(path.with_suffix(".npy"), X)
+    save_array(path_target, y, delimiter)
 
 
 # ============ MAIN ============
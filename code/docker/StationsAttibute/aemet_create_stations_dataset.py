@@ -1,87 +1,126 @@
-import json
 import os
+from itertools import islice
 from pathlib import Path
+from typing import Dict, Iterable, List
 
 import numpy as np
 import pandas as pd
 import typer
 
+# Streaming JSON reader shared with the AEMET Upload DB component
+from json_records import iter_json_records
+
 
 # ============== METHODS ==============
+def parse_records(records: Iterable[Dict[str, str]], attributes: List[str]):
+    # Normalise a batch of records into a compact (fecha, indicativo, values) frame
+    records = list(records)
+    frame = pd.DataFrame(
+        {
+            "fecha": [data_station["fecha"] for data_station in records],
+            "indicativo": [data_station["indicativo"] for data_station in records],
+        }
+    )
+    for attribute in attributes:
+        frame[attribute] = [
+            data_station.get(attribute, np.nan) for data_station in records
+        ]
+
+        # "Ip" (inappreciable precipitation) is 0 and AEMET uses comma decimals
+        frame[attribute] = (
+            frame[attribute]
+            .astype("string")
+            .replace("Ip", "0")
+            .str.replace(",", ".", regex=False)
+            .astype(float)
+        )
+    return frame
+
+
+def stations_dataframes(
+    records: Iterable[Dict[str, str]], attributes: List[str], batch_size: int
+):
+    # Each batch is written into one (dates x stations) array per attribute, so
+    # memory grows with the output matrices and one batch, not with the file.
+    # Rows and columns keep the order in which dates and stations first appear,
+    # repeated (fecha, indicativo) records keep the last value
+    records = iter(records)
+    dates: Dict[str, int] = {}
+    stations: Dict[str, int] = {}
+    values = {attribute: np.full((0, 0), np.nan) for attribute in attributes}
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        frame = parse_records(batch, attributes)
+        rows = np.array([dates.setdefault(day, len(dates)) for day in frame["fecha"]])
+        columns = np.array(
+            [
+                stations.setdefault(station, len(stations))
+                for station in frame["indicativo"]
+            ]
+        )
+        last = ~frame.duplicated(subset=["fecha", "indicativo"], keep="last")
+        rows, columns = rows[last.to_numpy()], columns[last.to_numpy()]
+        frame = frame[last]
+        for attribute in attributes:
+            array = values[attribute]
+            if array.shape[0] < len(dates) or array.shape[1] < len(stations):
+                # Grow a full dimension geometrically so the copies stay linear
+                # in the output size
+                shape = [
+                    size if size >= needed else max(needed, 2 * size)
+                    for size, needed in zip(array.shape, (len(dates), len(stations)))
+                ]
+                grown = np.full(shape, np.nan)
+                grown[: array.shape[0], : array.shape[1]] = array
+                values[attribute] = array = grown
+            array[rows, columns] = frame[attribute].to_numpy()
+
+    if not dates:
+        return {attribute: pd.DataFrame() for attribute in attributes}
+
+    dataframes = {}
+    for attribute in attributes:
+        dataframe = pd.DataFrame(
+            values[attribute][: len(dates), : len(stations)],
+            index=pd.Index(list(dates), name="fecha"),
+            columns=pd.Index(list(stations), name="indicativo"),
+        )
+        dataframe.insert(1, "DATE", dataframe.index)
+        dataframes[attribute] = dataframe
+
+    return dataframes
+
+
 def aemet_create_stations_dataset(
     json_file: str = typer.Option(..., help="JSON file path"),
-    attribute: str = typer.Option(
+    attribute: List[str] = typer.Option(
         ...,
-        help="Attribute name from AEMET, could be: prec, tmin, tmax, tmed, dir, velmedia, racha, sol, presMax or presMin",
+        help="Attribute name from AEMET, could be: prec, tmin, tmax, tmed, dir, velmedia, racha, sol, presMax or presMin. "
+        "Repeat the option to create one CSV per attribute in a single pass",
     ),
     delimiter: str = typer.Option(..., help="Delimiter for CSV output file"),
+    batch_size: int = typer.Option(
+        100000, min=1, help="Number of JSON records parsed at the same time"
+    ),
 ):
     os.chdir("data")
 
-    # Read JSON file
-    f = open(json_file)
-    json_data = json.load(f)
-
-    # Create Dataframe
-    dataframe = pd.DataFrame()
-
-    # Add data to Dataframe
-    for station in json_data:
-        for data_station in station:
-            if attribute in data_station:
-                dataframe.loc[
-                    data_station["fecha"], data_station["indicativo"]
-                ] = data_station[attribute]
-                dataframe.loc[data_station["fecha"], "DATE"] = data_station["fecha"]
-                if data_station[attribute] == "Ip":
-                    dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ] = dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ].replace(
-                        "Ip", "0"
-                    )
-
-                    dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ] = dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ].replace(
-                        ",", "."
-                    )
-
-                    dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ] = float(
-                        dataframe.loc[data_station["fecha"], data_station["indicativo"]]
-                    )
-                else:
-                    dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ] = dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ].replace(
-                        ",", "."
-                    )
-
-                    dataframe.loc[
-                        data_station["fecha"], data_station["indicativo"]
-                    ] = float(
-                        dataframe.loc[data_station["fecha"], data_station["indicativo"]]
-                    )
-            else:
-                dataframe.loc[
-                    data_station["fecha"], data_station["indicativo"]
-                ] = np.nan
-                dataframe.loc[data_station["fecha"], "DATE"] = data_station["fecha"]
-
-    # Output file
-    dirname = ""
-    filename = "Aemet_" + attribute + "_stations"
-    suffix = ".csv"
-    path = Path(dirname, filename).with_suffix(suffix)
-
-    dataframe.to_csv(path, sep=delimiter, index=False, decimal=".")
+    # Read JSON file once and create one Dataframe per attribute
+    attributes = list(dict.fromkeys(attribute))
+    dataframes = stations_dataframes(
+        iter_json_records(json_file), attributes, batch_size
+    )
+
+    # Output files
+    for attribute_name, dataframe in dataframes.items():
+        dirname = ""
+        filename = "Aemet_" + attribute_name + "_stations"
+        suffix = ".csv"
+        path = Path(dirname, filename).with_suffix(suffix)
+
+        dataframe.to_csv(path, sep=delimiter, index=False, decimal=".")
 
 
 # ============== MAIN ==============
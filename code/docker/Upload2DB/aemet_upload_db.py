@@ -1,12 +1,30 @@
-import json
 import os
+import time
 from datetime import datetime
+from itertools import islice
+from typing import Dict, List
 
 import typer
-from pymongo import MongoClient
+from pymongo import ASCENDING, MongoClient, UpdateOne
+
+# Streaming JSON reader shared with the AEMET Create Stations Dataset component
+from json_records import iter_json_records
 
 
 # ============ METHODS ============
+def upsert_operations(batch: List[Dict]):
+    # One upsert per date, merging repeated dates in file order so the batch
+    # gives the same result as sequential updates even when run unordered
+    records = {}
+    for data in batch:
+        data["fecha"] = datetime.strptime(data["fecha"], "%Y-%m-%d")
+        records.setdefault(data["fecha"], {}).update(data)
+    return [
+        UpdateOne({"fecha": fecha}, {"$set": data}, upsert=True)
+        for fecha, data in records.items()
+    ]
+
+
 def aemet_upload_db(
     input_filepath: str = typer.Option(..., help="File path of the JSON file"),
     user: str = typer.Option(..., help="Username of MongoDB"),
@@ -14,6 +32,13 @@ def aemet_upload_db(
     path: str = typer.Option(..., help="Mongo Path of MongoDB"),
     database: str = typer.Option(..., help="Mongo Database"),
     collection: str = typer.Option(..., help="Mongo Collection of MongoDB"),
+    batch_size: int = typer.Option(
+        1000, min=1, help="Number of records per bulk write"
+    ),
+    ordered: bool = typer.Option(
+        False,
+        help="Stop each bulk write at the first error instead of running unordered",
+    ),
 ):
     # Switch Working Dir
     os.chdir("data")
@@ -23,14 +48,35 @@ def aemet_upload_db(
     db = c[database]
     collection = db[collection]
 
-    # Read File
-    f = open(input_filepath)
-    json_data = json.load(f)
+    # Upserts match on fecha
+    collection.create_index([("fecha", ASCENDING)])
 
-    # Upload File
-    for data in json_data:
-        data["fecha"] = datetime.strptime(data["fecha"], "%Y-%m-%d")
-        collection.update_one({"fecha": data["fecha"]}, {"$set": data}, upsert=True)
+    # Read and Upload File in bulk write batches
+    records = iter_json_records(input_filepath)
+    total_records = 0
+    latencies = []
+    start = time.perf_counter()
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        operations = upsert_operations(batch)
+        batch_start = time.perf_counter()
+        collection.bulk_write(operations, ordered=ordered)
+        latencies.append(time.perf_counter() - batch_start)
+        total_records += len(batch)
+        print(
+            f"Batch {len(latencies)}: {len(operations)} upserts in {latencies[-1] * 1000:.1f} ms"
+        )
+    elapsed = time.perf_counter() - start
+
+    if latencies:
+        print(
+            f"Uploaded {total_records} records in {elapsed:.2f} s "
+            f"({total_records / elapsed:.0f} records/s), batch latency "
+            f"mean {sum(latencies) / len(latencies) * 1000:.1f} ms, "
+            f"max {max(latencies) * 1000:.1f} ms"
+        )
 
 
 # ============ MAIN ============
@@ -0,0 +1,100 @@
+"""On-disk cache of AEMET daily weather responses
+
+Shared by the AEMET Download Data and AEMET Station Weather Attributes
+components, their images copy this module next to their script, see their
+dockerfiles
+"""
+
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+
+class AemetCache:
+    # Windows ending before this margin are closed and never change on AEMET
+    CLOSED_AFTER = timedelta(weeks=4)
+
+    def __init__(self, cache_dir: str, ttl: float, max_size_mb: float):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_size = max_size_mb * 1024 * 1024
+
+    def _path(self, station: str, start_date: datetime, end_date: datetime):
+        filename = f"{station}_{start_date:%Y%m%d}_{end_date:%Y%m%d}"
+        return Path(self.cache_dir, filename).with_suffix(".json")
+
+    def get(self, station: str, start_date: datetime, end_date: datetime):
+        path = self._path(station, start_date, end_date)
+        try:
+            with open(path, encoding="utf8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # A truncated or legacy entry is a miss, it is rewritten by the next put
+        try:
+            expired = entry["expires"] is not None and entry["expires"] < time.time()
+            data = entry["data"]
+        except (KeyError, TypeError):
+            expired, data = True, None
+        if expired:
+            path.unlink(missing_ok=True)
+            return None
+        # Touch the entry so the LRU eviction keeps it
+        os.utime(path)
+        return data
+
+    def put(self, station: str, start_date: datetime, end_date: datetime, data):
+        if end_date < date.today() - self.CLOSED_AFTER:
+            expires = None
+        else:
+            expires = time.time() + self.ttl
+        path = self._path(station, start_date, end_date)
+        # Concurrent downloads of the same window each write their own temporary file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf8") as f:
+            json.dump({"expires": expires, "data": data}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        # Remove least recently used entries until the cache fits in max_size
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+def get_cached(
+    cache: Optional[AemetCache], station: str, start_date: datetime, end_date: datetime
+):
+    # Cached response of a window, None on a miss or when the cache is disabled
+    if cache is None:
+        return None
+    return cache.get(station, start_date, end_date)
+
+
+def put_cached(
+    cache: Optional[AemetCache],
+    station: str,
+    start_date: datetime,
+    end_date: datetime,
+    data,
+):
+    # Cache a list response when the cache is enabled, error payloads are not
+    if cache is not None and isinstance(data, list):
+        cache.put(station, start_date, end_date, data)
+    return data
@@ -0,0 +1,20 @@
+"""Date windows of the AEMET daily weather API
+
+Shared by the AEMET Download Data and AEMET Station Weather Attributes
+components, their images copy this module next to their script, see their
+dockerfiles
+"""
+
+from datetime import datetime
+
+from dateutil.relativedelta import relativedelta
+
+
+def date_windows(start_date: datetime, end_date: datetime):
+    # Split the date range in the 3-year windows accepted by the AEMET API
+    windows = []
+    start = start_date
+    while start <= end_date:
+        windows.append((start, min(start + relativedelta(years=3), end_date)))
+        start = start + relativedelta(day=1, years=3)
+    return windows
@@ -0,0 +1,38 @@
+"""Array files exchanged by the Data Normalization, Split Sequences Multivariable
+and LSTM Model components
+
+The producer and consumer of each file must agree on its format, so their images
+copy this module next to their script, see their dockerfiles
+"""
+
+from pathlib import Path
+
+from numpy import load, loadtxt, ndarray, save, savetxt, savez
+
+OUTPUT_FORMATS = ("csv", "npy", "npz")
+
+
+def load_array(filepath: str, delimiter: str) -> ndarray:
+    """
+    Memory-map .npy files, read the first array of .npz files and any other
+    file as delimited text
+    """
+    suffix = Path(filepath).suffix
+    if suffix == ".npy":
+        return load(filepath, mmap_mode="r")
+    if suffix == ".npz":
+        with load(filepath) as arrays:
+            return arrays[arrays.files[0]]
+    return loadtxt(filepath, delimiter=delimiter)
+
+
+def save_array(path: Path, array: ndarray, delimiter: str):
+    """
+    Save an array as .npy, .npz or, for any other suffix, delimited text
+    """
+    if path.suffix == ".npy":
+        save(path, array)
+    elif path.suffix == ".npz":
+        savez(path, array)
+    else:
+        savetxt(path, array, delimiter=delimiter)
@@ -0,0 +1,15 @@
+"""CPU count shared by the components running parallel workers
+
+The SARIMA Model, LSTM Model and RandomForest images copy this module next to
+their script, see their dockerfiles
+"""
+
+import os
+
+
+def available_cpus():
+    """Number of CPUs this process may run on, which can be less than os.cpu_count()
+    in a container or under taskset"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
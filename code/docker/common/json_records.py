@@ -0,0 +1,43 @@
+"""Streaming reader of the AEMET JSON files
+
+Shared by the AEMET Create Stations Dataset and AEMET Upload DB components,
+their images copy this module next to their script, see their dockerfiles
+"""
+
+import json
+
+
+def iter_json_records(json_file: str, chunk_size: int = 1 << 16):
+    # Yield the JSON objects of a (possibly nested) list of lists one at a time,
+    # without loading the whole file in memory
+    decoder = json.JSONDecoder()
+    with open(json_file, encoding="utf8") as f:
+        buffer = ""
+        position = 0
+        eof = False
+        while True:
+            # Skip whitespace and list delimiters between records
+            while position < len(buffer) and buffer[position] in " \t\r\n[],":
+                position += 1
+            if position == len(buffer):
+                if eof:
+                    return
+                buffer = f.read(chunk_size)
+                position = 0
+                eof = not buffer
+                continue
+            if buffer[position] != "{":
+                raise ValueError(
+                    f"Unexpected character {buffer[position]!r} in {json_file}"
+                )
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The record continues in the next chunk
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield record
@@ -0,0 +1,68 @@
+"""Monthly aggregation shared by the Scale By Months and Seasonality components
+
+Both images copy this module next to their script, see their dockerfiles
+"""
+
+from typing import Dict, List, Union
+
+import pandas as pd
+import typer
+
+AGGREGATIONS = ("sum", "mean", "max")
+
+
+def monthly_aggregate(
+    dataframe: pd.DataFrame,
+    date_column: str,
+    aggregation: Union[str, Dict[str, str]] = "sum",
+):
+    """
+    Aggregate a dataframe by months in a single groupby pass.
+
+    aggregation is sum, mean or max, for every column or as a {column: function}
+    dict, columns missing from the dict are summed. Months keep the order in
+    which they first appear
+
+    Returns the aggregated Dataframe with a monthly PeriodIndex
+    """
+    months = pd.to_datetime(dataframe[date_column]).dt.to_period("M")
+    values = dataframe.drop([date_column], axis=1)
+    if isinstance(aggregation, str):
+        aggregation = dict.fromkeys(values.columns, aggregation)
+    else:
+        unknown = set(aggregation) - set(values.columns)
+        if unknown:
+            raise ValueError(f"Unknown columns {sorted(unknown)} in the aggregation")
+        aggregation = {
+            column: aggregation.get(column, "sum") for column in values.columns
+        }
+    for column, function in aggregation.items():
+        if function not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {function!r} for column {column}")
+
+    monthly = values.groupby(months.rename(date_column), sort=False).agg(aggregation)
+    return monthly.astype(float)
+
+
+def parse_aggregation(entries: List[str], columns: List[str]):
+    # {column: function} of the column:function entries of --aggregation
+    aggregation = {}
+    for entry in entries:
+        column, separator, function = entry.rpartition(":")
+        if not separator:
+            raise typer.BadParameter(
+                f"{entry!r} is not column:function", param_hint="--aggregation"
+            )
+        if column not in columns:
+            raise typer.BadParameter(
+                f"unknown column {column!r}, use one of {list(columns)}",
+                param_hint="--aggregation",
+            )
+        if function not in AGGREGATIONS:
+            raise typer.BadParameter(
+                f"unknown function {function!r} for column {column!r}, "
+                f"use one of {list(AGGREGATIONS)}",
+                param_hint="--aggregation",
+            )
+        aggregation[column] = function
+    return aggregation
@@ -0,0 +1,385 @@
+"""SARIMAX fitting, fit cache and order search shared by the SARIMA components
+
+The Seasonality (arima.py), SARIMA Model (sarima_model.py) and SARIMA Evaluation
+images copy this module next to their script, see their dockerfiles
+"""
+
+import hashlib
+import json
+import math
+import os
+import signal
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+from threadpoolctl import threadpool_limits
+
+
+class OrderSearch(str, Enum):
+    """SARIMA order searches of the components: every order of the grid, or the
+    neighbours of the best order found so far (see stepwise_search)"""
+
+    grid = "grid"
+    stepwise = "stepwise"
+
+
+def series_digest(endog, exog=None, nobs=None):
+    """sha256 of the first nobs rows (all by default) of the series and exogenous matrix"""
+    digest = hashlib.sha256()
+    endog = np.asarray(endog, dtype=float).ravel()
+    nobs = len(endog) if nobs is None else nobs
+    for values in (endog, exog):
+        if values is None:
+            digest.update(b"None")
+            continue
+        values = np.ascontiguousarray(
+            np.asarray(values, dtype=float).reshape(len(endog), -1)[:nobs]
+        )
+        digest.update(str(values.shape).encode())
+        digest.update(values.tobytes())
+    return digest
+
+
+class SarimaxFitCache:
+    """On-disk cache of fitted SARIMAX parameters and AIC
+
+    Entries are addressed by a hash of the series, the exogenous matrix, the
+    order, the seasonal order and the model flags, so they are only reused by
+    fits of the same model on the same data, e.g. a rerun of a component
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def key(endog, exog, order, seasonal_order, **flags):
+        digest = series_digest(endog, exog)
+        specification = [list(order), list(seasonal_order), flags]
+        digest.update(json.dumps(specification, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        try:
+            with open(Path(self.cache_dir, key).with_suffix(".json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, params, aic):
+        path = Path(self.cache_dir, key).with_suffix(".json")
+        # Workers fitting the same key each write their own temporary file
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"params": list(params), "aic": aic}, f)
+        os.replace(tmp_path, path)
+
+    def put_start(self, entry):
+        # Latest full fit of each specification, whatever the series, to warm
+        # start the fits of later runs
+        specification = [entry["order"], entry["seasonal_order"], entry["flags"]]
+        name = hashlib.sha256(
+            json.dumps(specification, sort_keys=True).encode()
+        ).hexdigest()
+        path = Path(self.cache_dir, "start", name).with_suffix(".json")
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def start_entries(self):
+        for path in Path(self.cache_dir, "start").glob("*.json"):
+            try:
+                with open(path) as f:
+                    yield json.load(f)
+            except (OSError, ValueError):
+                continue
+
+
+def start_entry(results):
+    """Describe a fitted SARIMAX model so it can warm start a later fit"""
+    model = results.model
+    return {
+        "order": list(model.order),
+        "seasonal_order": list(model.seasonal_order),
+        "flags": {
+            "enforce_stationarity": model.enforce_stationarity,
+            "enforce_invertibility": model.enforce_invertibility,
+        },
+        "nobs": int(model.nobs),
+        "digest": series_digest(model.endog, model.exog).hexdigest(),
+        "param_names": list(model.param_names),
+        "params": np.asarray(results.params, dtype=float).tolist(),
+    }
+
+
+def warm_start_candidates(entries, endog, exog, **flags):
+    """Keep the fits made with the same flags on a prefix of the series"""
+    endog_length = len(endog)
+    candidates = []
+    for entry in entries:
+        if entry["flags"] != flags or entry["nobs"] > endog_length:
+            continue
+        if series_digest(endog, exog, entry["nobs"]).hexdigest() == entry["digest"]:
+            candidates.append(entry)
+    return candidates
+
+
+def warm_start_params(model, candidates):
+    """start_params of model taken from the candidate fit of the same orders
+
+    Only the same specification is used, parameters of other orders are a poor
+    starting point. The fit on the longest prefix of the series wins. Returns None
+    without such a candidate
+    """
+    same = [
+        entry
+        for entry in candidates
+        if entry["order"] == list(model.order)
+        and entry["seasonal_order"] == list(model.seasonal_order)
+        and entry["param_names"] == list(model.param_names)
+    ]
+    if not same:
+        return None
+    return np.asarray(max(same, key=lambda entry: entry["nobs"])["params"])
+
+
+def fit_sarimax(
+    cache,
+    endog,
+    exog,
+    order,
+    seasonal_order,
+    maxiter=None,
+    start_params=None,
+    start_candidates=None,
+    key=None,
+    **flags,
+):
+    """Fit a SARIMAX model, or rebuild it from the parameters cached for the same
+    series and specification without running the optimizer
+
+    start_params - parameters the optimizer starts from, e.g. those of a short
+                   fit of the same model being resumed
+    start_candidates - previous fits (see warm_start_candidates) seeding the
+                       optimizer when start_params is not given
+    key - cache key of the fit when the caller already computed it
+    """
+    model = sm.tsa.statespace.SARIMAX(
+        endog=endog, exog=exog, order=order, seasonal_order=seasonal_order, **flags
+    )
+    if cache and key is None:
+        key = SarimaxFitCache.key(
+            endog, exog, order, seasonal_order, maxiter=maxiter, **flags
+        )
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        return model.smooth(np.asarray(cached["params"]))
+
+    fit_options = {"disp": False, **({"maxiter": maxiter} if maxiter else {})}
+    warm_start = start_params is None and start_candidates
+    if warm_start:
+        start_params = warm_start_params(model, start_candidates)
+    results = model.fit(
+        start_params=None if start_params is None else np.asarray(start_params),
+        **fit_options,
+    )
+    # A warm start that does not converge falls back to the default start values
+    if (
+        warm_start
+        and start_params is not None
+        and not results.mle_retvals.get("converged", True)
+    ):
+        cold_results = model.fit(**fit_options)
+        if cold_results.llf > results.llf:
+            results = cold_results
+    if cache:
+        cache.put(key, results.params.tolist(), results.aic)
+        if not maxiter:
+            cache.put_start(start_entry(results))
+    return results
+
+
+def cached_fit(
+    cache,
+    endog,
+    exog,
+    order,
+    seasonal_order,
+    maxiter=None,
+    start_params=None,
+    start_candidates=None,
+    **flags,
+):
+    """AIC and parameters of a SARIMAX model, read from the cache when it was
+    already fitted"""
+    key = None
+    if cache:
+        key = SarimaxFitCache.key(
+            endog, exog, order, seasonal_order, maxiter=maxiter, **flags
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            return cached["aic"], cached["params"]
+    results = fit_sarimax(
+        cache,
+        endog,
+        exog,
+        order,
+        seasonal_order,
+        maxiter=maxiter,
+        start_params=start_params,
+        start_candidates=start_candidates,
+        key=key,
+        **flags,
+    )
+    return results.aic, results.params.tolist()
+
+
+# Series, fit cache and warm start fits shared with the order search worker
+# processes, or with fit_aic calls in the main process
+_endog = None
+_exog = None
+_cache = None
+_start_candidates = None
+
+
+def _set_fit_state(endog, exog, cache_dir=None, start_candidates=None):
+    # State read by fit_aic, set in the main process to fit orders one at a time
+    global _endog, _exog, _cache, _start_candidates
+    _endog, _exog = endog, exog
+    _cache = SarimaxFitCache(cache_dir) if cache_dir else None
+    _start_candidates = start_candidates
+
+
+def _init_worker(endog, exog, cache_dir=None, start_candidates=None):
+    # The small SARIMAX matrices gain nothing from BLAS threads, which would
+    # only compete with the other worker processes for the CPUs
+    threadpool_limits(1)
+    _set_fit_state(endog, exog, cache_dir, start_candidates)
+
+
+def _fit_timeout(signum, frame):
+    raise TimeoutError
+
+
+def fit_aic(param, s, timeout=0, maxiter=None, start_params=None):
+    """Fit one (p, d, q, P, D, Q) order of season s on the series set by _init_worker
+    or _set_fit_state
+
+    Returns the order, the AIC, the fitted parameters and whether the fit was
+    stopped by the timeout, with None as AIC and parameters if the fit fails or
+    exceeds timeout seconds (0 for no limit). The timeout is wall clock time, a
+    fit can exceed it when more workers than CPUs run. maxiter limits the
+    optimizer iterations for a short partial fit, start_params resumes a
+    previous fit of the same order
+    """
+    if timeout:
+        signal.signal(signal.SIGALRM, _fit_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        aic, params = cached_fit(
+            _cache,
+            _endog,
+            _exog,
+            tuple(param[:3]),
+            tuple(param[3:]) + (s,),
+            maxiter=maxiter,
+            start_params=start_params,
+            start_candidates=_start_candidates,
+            enforce_stationarity=False,
+            enforce_invertibility=False,
+        )
+        if not np.isfinite(aic):
+            return param, None, None, False
+        return param, aic, params, False
+    except TimeoutError:
+        return param, None, None, True
+    # we need try-except because on some combinations model fails to converge
+    except Exception:
+        return param, None, None, False
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def stepwise_search(evaluate, seeds, bounds, partial_maxiter=10, keep=0.5):
+    """Greedy search over neighbouring orders, starting from a few seed orders
+
+    evaluate - function fitting a list of orders with a maximum of iterations
+               (None for a full fit) and a list of start parameters (None to
+               start from the statsmodels defaults), returning an (aic, params)
+               pair per order, (None, None) if a fit fails
+    seeds - list of (p, d, q, P, D, Q) tuples fitted first
+    bounds - (min, max) of each order parameter
+    partial_maxiter - iterations of the short fit of every neighbour
+    keep - fraction of the neighbours, ranked by their short fit AIC, whose fit
+           is resumed from the short fit parameters up to convergence
+
+    Short fits are only ranked against each other, an unfinished fit is never
+    compared with the AIC of a converged one
+
+    Returns the table of fully fitted orders sorted by AIC and the number of full
+    and partial fits
+    """
+    seeds = list(dict.fromkeys(seeds))
+    seen = set(seeds)
+    results = {
+        seed: aic
+        for seed, (aic, _) in zip(seeds, evaluate(seeds, None, [None] * len(seeds)))
+        if aic is not None
+    }
+    full_fits, partial_fits = len(seeds), 0
+
+    best = min(results, key=results.get) if results else None
+    while best is not None:
+        # Orders one step away from the best one in any parameter
+        neighbours = []
+        for i, (low, high) in enumerate(bounds):
+            for step in (-1, 1):
+                value = best[i] + step
+                candidate = best[:i] + (value,) + best[i + 1 :]
+                if low <= value <= high and candidate not in seen:
+                    seen.add(candidate)
+                    neighbours.append(candidate)
+        if not neighbours:
+            break
+
+        # Short fits first, the best ranked ones are resumed to a full fit
+        partial = [
+            (candidate, aic, params)
+            for candidate, (aic, params) in zip(
+                neighbours,
+                evaluate(neighbours, partial_maxiter, [None] * len(neighbours)),
+            )
+            if aic is not None
+        ]
+        partial_fits += len(neighbours)
+        partial.sort(key=lambda fit: fit[1])
+        promising = partial[: math.ceil(len(partial) * keep)]
+        full_fits += len(promising)
+        for (candidate, _, _), (aic, _) in zip(
+            promising,
+            evaluate(
+                [candidate for candidate, _, _ in promising],
+                None,
+                [params for _, _, params in promising],
+            ),
+        ):
+            if aic is not None:
+                results[candidate] = aic
+
+        new_best = min(results, key=results.get)
+        if new_best == best:
+            break
+        best = new_best
+
+    result_table = pd.DataFrame(
+        sorted(results.items(), key=lambda result: result[1]),
+        columns=["parameters", "aic"],
+    )
+    return result_table, full_fits, partial_fits
@@ -13,7 +13,14 @@ from drama_enbic2lab.model import Pdf, Png
 class PdfSeasonality(Pdf):
     pass
 
-def execute(pcs: Process, date_column: str, pollen: str, year: int):
+def execute(
+    pcs: Process,
+    date_column: str,
+    pollen: str,
+    year: int,
+    search: str = "grid",
+    cache_dir: str = "~/.cache/enbic2lab/sarimax",
+):
     f"""
     Name:
         Stationarity and Seasonality
@@ -28,6 +35,8 @@ def execute(pcs: Process, date_column: str, pollen: str, year: int):
         * date_column (str) -> Name of the Date column
         * pollen (str) -> Name of the Pollen column
         * year (int) -> Year for decomposition
+        * search (str) -> SARIMAX order search, grid or stepwise
+        * cache_dir (str) -> Host directory of the SARIMAX fit cache, reused by later runs on the same data, empty to disable it
 
         Mutually Inclusive:
         None
@@ -61,14 +70,22 @@ def execute(pcs: Process, date_column: str, pollen: str, year: int):
     if not in_csv.is_file():
         shutil.copyfile(local_file_path, in_csv)
 
+    volumes = {local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}}
+    cache_param = ""
+    if cache_dir:
+        local_cache_path = Path(cache_dir).expanduser()
+        local_cache_path.mkdir(parents=True, exist_ok=True)
+        volumes[local_cache_path] = {"bind": "/usr/local/src/cache", "mode": "rw"}
+        cache_param = "--cache-dir /usr/local/src/cache"
+
     # Docker
     image_name = "enbic2lab/air/arima"
     # get docker image
     client = docker.from_env()
     container = client.containers.run(
         image=image_name,
-        volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
-        command=f"--filepath '{local_file_path.name}' --delimiter '{input_file_delimiter}' --pollen '{pollen}' --date-column '{date_column}' --year {year}",
+        volumes=volumes,
+        command=f"--filepath '{local_file_path.name}' --delimiter '{input_file_delimiter}' --pollen '{pollen}' --date-column '{date_column}' --year {year} --search {search} {cache_param}",
         detach=True,
         tty=True,
     )
@@ -1,6 +1,6 @@
 import shutil
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import docker
 from drama.core.model import SimpleTabularDataset
@@ -9,7 +9,11 @@ from drama.process import Process
 
 
 def execute(
-    pcs: Process, acum_list_attr: List[str], mm_list_attr: List[str], outfile_name: str
+    pcs: Process,
+    acum_list_attr: List[str],
+    mm_list_attr: List[str],
+    outfile_name: str,
+    windows: Optional[List[int]] = None,
 ):
     """
 
@@ -26,6 +30,7 @@ def execute(
         acum_list_attr (List[str]) --> List of attributes for doing statistics with them.
         mm_list_attr (List[str]) --> List of attributes for mm statistic.
         outfile_name (str) --> Name of the output CSV file without extension.
+        windows (List[int]) --> Window sizes in rows of the accumulated and moving mean statistics, 3 and 5 by default.
 
     Mutually Inclusive:
         total_list_attr with acum_list_attr and mm_list_attr
@@ -62,6 +67,7 @@ def execute(
     mm_attribute_list_param = " ".join(
         f'--mm-list-attr "{attribute}"' for attribute in mm_list_attr
     )
+    windows_param = " ".join(f"--windows {window}" for window in windows or [])
 
     # Docker
     image_name = "enbic2lab/air/aemet_add_statistics"
@@ -70,7 +76,7 @@ def execute(
     container = client.containers.run(
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
-        command=f"--filepath '{local_file_path.name}' --delimiter {input_file_delimiter} --outfile-name '{outfile_name}' {acum_attribute_list_param} {mm_attribute_list_param}",
+        command=f"--filepath '{local_file_path.name}' --delimiter {input_file_delimiter} --outfile-name '{outfile_name}' {acum_attribute_list_param} {mm_attribute_list_param} {windows_param}",
         detach=True,
         tty=True,
     )
@@ -1,5 +1,6 @@
 import shutil
 from pathlib import Path
+from typing import List, Optional
 
 import docker
 from drama.core.model import SimpleTabularDataset
@@ -7,7 +8,12 @@ from drama.models.task import TaskResult
 from drama.process import Process
 
 
-def execute(pcs: Process, attribute: str, delimiter: str):
+def execute(
+    pcs: Process,
+    attribute: str,
+    delimiter: str,
+    additional_attributes: Optional[List[str]] = None,
+):
     """
 
     Name:
@@ -22,6 +28,7 @@ def execute(pcs: Process, attribute: str, delimiter: str):
     Parameters:
         attribute (str) -> Attribute name from AEMET.
         delimiter (str) -> Delimiter for CSV output file.
+        additional_attributes (List[str]) -> More attribute names from AEMET, created in the same pass.
 
 
     Mutually Inclusive:
@@ -32,7 +39,7 @@ def execute(pcs: Process, attribute: str, delimiter: str):
 
     Outputs:
        SimpleTabularDataset: A CSV with the code of the stations in columns, the attribute value per date as values of
-       the dataset.
+       the dataset. One per attribute, in the order attribute, additional_attributes.
 
     Outfiles:
         Aemet_'attribute'_stations.csv
@@ -53,6 +60,9 @@ def execute(pcs: Process, attribute: str, delimiter: str):
     if not in_json.is_file():
         shutil.copyfile(local_file_path, in_json)
 
+    attributes = list(dict.fromkeys([attribute, *(additional_attributes or [])]))
+    attribute_param = " ".join(f"--attribute '{name}'" for name in attributes)
+
     # Docker
     image_name = "enbic2lab/air/aemet_create_stations_dataset"
     # get docker image
@@ -60,7 +70,7 @@ def execute(pcs: Process, attribute: str, delimiter: str):
     container = client.containers.run(
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
-        command=f"--json-file  '{local_file_path.name}' --attribute '{attribute}' --delimiter '{delimiter}'",
+        command=f"--json-file  '{local_file_path.name}' {attribute_param} --delimiter '{delimiter}'",
         detach=True,
         tty=True,
     )
@@ -74,15 +84,18 @@ def execute(pcs: Process, attribute: str, delimiter: str):
     container.remove(v=True)
 
     # Outputs
-    out_csv = Path(pcs.storage.local_dir, f"Aemet_{attribute}_stations.csv")
-    # send time to remote storage
-    if not out_csv.is_file():
-        raise FileNotFoundError(f"{out_csv} is missing")
+    files = []
+    for name in attributes:
+        out_csv = Path(pcs.storage.local_dir, f"Aemet_{name}_stations.csv")
+        # send time to remote storage
+        if not out_csv.is_file():
+            raise FileNotFoundError(f"{out_csv} is missing")
 
-    dfs_dir = pcs.storage.put_file(out_csv)
+        dfs_dir = pcs.storage.put_file(out_csv)
 
-    # send to downstream
-    output_csv = SimpleTabularDataset(resource=dfs_dir, delimiter=delimiter)
-    pcs.to_downstream(output_csv)
+        # send to downstream
+        output_csv = SimpleTabularDataset(resource=dfs_dir, delimiter=delimiter)
+        pcs.to_downstream(output_csv)
+        files.append(dfs_dir)
 
-    return TaskResult(files=[dfs_dir])
+    return TaskResult(files=files)
@@ -14,6 +14,9 @@ def execute(
     station: str,
     aemet_api_key: str,
     delimiter: str,
+    max_concurrency: int = 4,
+    cache_dir: str = "~/.cache/enbic2lab/aemet",
+    incremental: bool = False,
 ):
     """
 
@@ -32,6 +35,9 @@ def execute(
         station (str) -> Code of the station from AEMET
         aemet-api-key (str) -> Api Key providing by AEMET web page (https://opendata.aemet.es/centrodedescargas/altaUsuario?).
         delimiter (str) -> Delimiter of the output CSV File.
+        max-concurrency (int) -> Maximum number of date windows downloaded at the same time.
+        cache-dir (str) -> Host directory of the persistent AEMET response cache, empty to disable it.
+        incremental (bool) -> Only download the date ranges missing from an existing station CSV.
 
 
     Mutually Inclusive:
@@ -52,15 +58,24 @@ def execute(
 
     local_component_path = Path(pcs.storage.local_dir)
 
+    volumes = {local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}}
+    cache_param = ""
+    if cache_dir:
+        local_cache_path = Path(cache_dir).expanduser()
+        local_cache_path.mkdir(parents=True, exist_ok=True)
+        volumes[local_cache_path] = {"bind": "/usr/local/src/cache", "mode": "rw"}
+        cache_param = "--cache-dir /usr/local/src/cache"
+
     # Docker
     image_name = "enbic2lab/air/aemet_download_data"
     # get docker image
     client = docker.from_env()
     container = client.containers.run(
         image=image_name,
-        volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
+        volumes=volumes,
         command=f"--start-date  '{start_date}' --end-date '{end_date}' --station '{station}' "
-        f"--aemet-api-key {aemet_api_key} --delimiter {delimiter}",
+        f"--aemet-api-key {aemet_api_key} --delimiter {delimiter} --max-concurrency {max_concurrency} "
+        f"{cache_param} {'--incremental' if incremental else '--no-incremental'}",
         detach=True,
         tty=True,
     )
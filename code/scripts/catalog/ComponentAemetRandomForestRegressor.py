@@ -1,6 +1,6 @@
 import shutil
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import docker
 from drama.core.model import SimpleTabularDataset
@@ -8,7 +8,15 @@ from drama.models.task import TaskResult
 from drama.process import Process
 
 
-def execute(pcs: Process, date_column: str, dependent_variable: str):
+def execute(
+    pcs: Process,
+    date_column: str,
+    dependent_variable: str,
+    n_splits: int = 5,
+    n_estimators: int = 100,
+    n_jobs: int = 1,
+    workers: Optional[int] = None,
+):
     """
 
     Name:
@@ -23,35 +31,48 @@ def execute(pcs: Process, date_column: str, dependent_variable: str):
     Parameters:
         date_column (str) --> Name of the date column.
         dependent_variable (str) --> Name of the dependent variable column.
+        n_splits (int) --> Number of TimeSeriesSplit folds.
+        n_estimators (int) --> Number of trees of each random forest.
+        n_jobs (int) --> Number of jobs of each random forest, -1 to use all the CPUs.
+        workers (int) --> Number of folds fitted at the same time, the number of CPUs when not given.
 
     Mutually Inclusive:
         None
 
     Inputs:
-        SimpleTabularDataset: A CSV file with all the data processed.
+        SimpleTabularDataset: One or more CSV files with all the data processed, each one a candidate to score.
 
     Outputs:
-        SimpleTabularDataset: A CSV file with the metrics of the Random Forest.
+        SimpleTabularDataset: A CSV file with the metrics of the Random Forest, one row per candidate.
 
     Outfiles:
         filepath_metrics.csv
 
     """
 
-    # Inputs
+    # Inputs, every SimpleTabularDataset is a candidate scored in the same run
     inputs = pcs.get_from_upstream()
 
-    input_file = inputs["SimpleTabularDataset"][0]
-    input_file_resource = input_file["resource"]
-    input_file_delimiter = input_file["delimiter"]
-    local_file_path = Path(pcs.storage.get_file(input_file_resource))
+    input_files = inputs["SimpleTabularDataset"]
+    input_file_delimiter = input_files[0]["delimiter"]
+    local_file_paths = [
+        Path(pcs.storage.get_file(input_file["resource"])) for input_file in input_files
+    ]
+    names = [path.name for path in local_file_paths]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Candidate datasets with the same file name in {names}")
+    local_file_path = local_file_paths[0]
 
     local_component_path = Path(pcs.storage.local_dir)
 
-    # Copy file if it does not exist
-    in_csv = Path(local_component_path, local_file_path.name)
-    if not in_csv.is_file():
-        shutil.copyfile(local_file_path, in_csv)
+    # Copy files if they do not exist
+    for path in local_file_paths:
+        in_csv = Path(local_component_path, path.name)
+        if not in_csv.is_file():
+            shutil.copyfile(path, in_csv)
+
+    filepath_params = " ".join(f"--filepath '{path.name}'" for path in local_file_paths)
+    workers_param = f" --workers {workers}" if workers else ""
 
     # Docker
     image_name = "enbic2lab/air/aemet_random_forest_regression"
@@ -60,7 +81,8 @@ def execute(pcs: Process, date_column: str, dependent_variable: str):
     container = client.containers.run(
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
-        command=f"--filepath '{local_file_path.name}' --delimiter {input_file_delimiter} --date-column '{date_column}' --dependent-variable '{dependent_variable}'",
+        command=f"{filepath_params} --delimiter {input_file_delimiter} --date-column '{date_column}' --dependent-variable '{dependent_variable}' "
+        f"--n-splits {n_splits} --n-estimators {n_estimators} --n-jobs {n_jobs}{workers_param}",
         detach=True,
         tty=True,
     )
@@ -14,6 +14,10 @@ def execute(
     end_date: str,
     analysis_stations: List[str],
     aemet_api_key: str,
+    parallel: bool = False,
+    max_concurrency: int = 4,
+    requests_per_second: float = 2.0,
+    cache_dir: str = "~/.cache/enbic2lab/aemet",
 ):
     """
 
@@ -31,6 +35,10 @@ def execute(
         end-date (str) -> Last date of the date range, format (yyyy-mm-dd).
         analysis_stations (List[str]) -> Station list for AEMET data search.
         aemet-api-key (str) -> Api Key providing by AEMET web page (https://opendata.aemet.es/centrodedescargas/altaUsuario?).
+        parallel (bool) -> Download all stations and date windows concurrently.
+        max-concurrency (int) -> Maximum number of requests in flight in parallel mode.
+        requests-per-second (float) -> Maximum requests per second to each host in parallel mode.
+        cache-dir (str) -> Host directory of the persistent AEMET response cache, empty to disable it.
 
 
     Mutually Inclusive:
@@ -49,6 +57,14 @@ def execute(
 
     local_component_path = Path(pcs.storage.local_dir)
 
+    volumes = {local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}}
+    cache_param = ""
+    if cache_dir:
+        local_cache_path = Path(cache_dir).expanduser()
+        local_cache_path.mkdir(parents=True, exist_ok=True)
+        volumes[local_cache_path] = {"bind": "/usr/local/src/cache", "mode": "rw"}
+        cache_param = "--cache-dir /usr/local/src/cache"
+
     station_param = " ".join(
         f"--analysis-stations '{attribute}'" for attribute in analysis_stations
     )
@@ -59,9 +75,11 @@ def execute(
     client = docker.from_env()
     container = client.containers.run(
         image=image_name,
-        volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
+        volumes=volumes,
         command=f"--start-date '{start_date}' --end-date '{end_date}' --aemet-api-key '{aemet_api_key}' "
-        f"{station_param}",
+        f"{station_param} {'--parallel' if parallel else '--no-parallel'} "
+        f"--max-concurrency {max_concurrency} --requests-per-second {requests_per_second} "
+        f"{cache_param}",
         detach=True,
         tty=True,
     )
@@ -5,7 +5,14 @@ import docker
 from drama.process import Process
 
 
-def execute(pcs: Process, user: str, password: str, path: str, collection: str):
+def execute(
+    pcs: Process,
+    user: str,
+    password: str,
+    path: str,
+    collection: str,
+    batch_size: int = 1000,
+):
 
     """
     Name:
@@ -22,6 +29,7 @@ def execute(pcs: Process, user: str, password: str, path: str, collection: str):
         user (str): Host of MongoDB
         password (str): Password of MongoDB
         path (str): Url of MongoDB
+        batch_size (int): Number of records per bulk write
 
     Inputs:
         InputFile (JSONFile)
@@ -57,7 +65,7 @@ def execute(pcs: Process, user: str, password: str, path: str, collection: str):
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
         command=f"--input-filepath {local_file_path.name} --collection '{collection}' --user '{user}' "
-        f"--password '{password}' --path {path}",
+        f"--password '{password}' --path {path} --batch-size {batch_size}",
         detach=True,
         tty=True,
     )
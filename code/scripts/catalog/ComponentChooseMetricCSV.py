@@ -4,6 +4,7 @@ import os
 import re
 import shutil
 from pathlib import Path
+from typing import List, Optional
 
 import docker
 from drama.core.model import SimpleTabularDataset
@@ -13,6 +14,8 @@ from drama.process import Process
 
 def execute(
     pcs: Process,
+    weights: Optional[List[str]] = None,
+    publish_mode: str = "link",
 ):
     """
 
@@ -26,7 +29,8 @@ def execute(
         Khaos Research Group
 
     Parameters:
-        None
+        weights (List[str]) --> Weight of the vote of each metric as metric:weight, e.g. r2_mean:2. Metrics not given weigh 1.
+        publish_mode (str) --> How the best file is published: link or rename.
 
     Mutually Inclusive:
         None
@@ -37,6 +41,7 @@ def execute(
         SimpleTabularDatasetSpline: A CSV file with the spline interpolation method from pandas.
         SimpleTabularDatasetLinear: A CSV file with the linear interpolation method from pandas.
         SimpleTabularDatasetTest: A CSV file with the metrics of the Random Forest.
+        Every SimpleTabularDataset input but SimpleTabularDatasetTest is a candidate, any number of files and any other SimpleTabularDataset* input name are ranked.
 
     Outputs:
         SimpleTabularDataset: A CSV file with the chosen interpolation method dataset.
@@ -49,61 +54,43 @@ def execute(
     # Input
     inputs = pcs.get_from_upstream()
 
-    input_file = inputs["SimpleTabularDataset"][0]
-    input_file_resource = input_file["resource"]
-    input_file_delimiter = input_file["delimiter"]
-    local_file_path = Path(pcs.storage.get_file(input_file_resource))
-
-    # Input Mean Interpolation
-
-    input_file_mean = inputs["SimpleTabularDatasetMean"][0]
-    input_file_resource_mean = input_file_mean["resource"]
-    input_file_delimiter_mean = input_file_mean["delimiter"]
-    local_file_path_mean = Path(pcs.storage.get_file(input_file_resource_mean))
-
-    # Input Spline Interpolation
-
-    input_file_spline = inputs["SimpleTabularDatasetSpline"][0]
-    input_file_resource_spline = input_file_spline["resource"]
-    input_file_delimiter_spline = input_file_spline["delimiter"]
-    local_file_path_spline = Path(pcs.storage.get_file(input_file_resource_spline))
-
-    # Input Linear Interpolation
-
-    input_file_linear = inputs["SimpleTabularDatasetLinear"][0]
-    input_file_resource_linear = input_file_linear["resource"]
-    input_file_delimiter_linear = input_file_linear["delimiter"]
-    local_file_path_linear = Path(pcs.storage.get_file(input_file_resource_linear))
-
     # Input Metrics
 
     input_file_test = inputs["SimpleTabularDatasetTest"][0]
     input_file_resource_test = input_file_test["resource"]
-    input_file_delimiter_test = input_file_test["delimiter"]
     local_file_path_test = Path(pcs.storage.get_file(input_file_resource_test))
 
+    # Input Candidates, every upstream dataset but the metrics, any number of them
+
+    input_files = [
+        input_file
+        for name, files in inputs.items()
+        if name.startswith("SimpleTabularDataset")
+        and name != "SimpleTabularDatasetTest"
+        for input_file in files
+    ]
+    if not input_files:
+        raise ValueError("No candidate dataset upstream")
+    input_file_delimiter = input_files[0]["delimiter"]
+    local_file_paths = [
+        Path(pcs.storage.get_file(input_file["resource"])) for input_file in input_files
+    ]
+    names = [path.name for path in local_file_paths]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Candidate datasets with the same file name in {names}")
+
     local_component_path = Path(pcs.storage.local_dir)
 
     # Copy file if it does not exist
-    in_csv = Path(local_component_path, local_file_path.name)
-    if not in_csv.is_file():
-        shutil.copyfile(local_file_path, in_csv)
-
-    in_csv_mean = Path(local_component_path, local_file_path_mean.name)
-    if not in_csv_mean.is_file():
-        shutil.copyfile(local_file_path_mean, in_csv_mean)
+    for local_file_path in local_file_paths + [local_file_path_test]:
+        in_csv = Path(local_component_path, local_file_path.name)
+        if not in_csv.is_file():
+            shutil.copyfile(local_file_path, in_csv)
 
-    in_csv_spline = Path(local_component_path, local_file_path_spline.name)
-    if not in_csv_spline.is_file():
-        shutil.copyfile(local_file_path_spline, in_csv_spline)
-
-    in_csv_linear = Path(local_component_path, local_file_path_linear.name)
-    if not in_csv_linear.is_file():
-        shutil.copyfile(local_file_path_linear, in_csv_linear)
-
-    in_csv_test = Path(local_component_path, local_file_path_test.name)
-    if not in_csv_test.is_file():
-        shutil.copyfile(local_file_path_test, in_csv_test)
+    candidate_params = " ".join(
+        f"--filepath-candidate '{path.name}'" for path in local_file_paths
+    )
+    weight_params = " ".join(f"--weight {weight}" for weight in weights or [])
 
     # Docker
     image_name = "enbic2lab/air/choose_metric_csv"
@@ -112,7 +99,8 @@ def execute(
     container = client.containers.run(
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
-        command=f"--filepath-no-interpolation '{local_file_path.name}' --delimiter {input_file_delimiter} --filepath-metrics '{local_file_path_test.name}' --filepath-line '{local_file_path_linear.name}' --filepath-mean '{local_file_path_mean.name}' --filepath-spline '{local_file_path_spline.name}'",
+        command=f"--filepath-metrics '{local_file_path_test.name}' --delimiter {input_file_delimiter} {candidate_params} "
+        f"{weight_params} --publish-mode {publish_mode}",
         detach=True,
         tty=True,
     )
@@ -18,7 +18,7 @@ class TempFileTarget(TempFile):
     pass
 
 
-def execute(pcs: Process):
+def execute(pcs: Process, output_format: str = "csv"):
     f"""
 
     Name:
@@ -31,7 +31,7 @@ def execute(pcs: Process):
         Khaos Research Group
 
     Parameters:
-        None
+        * --output_format (str) -> Format of the normalized arrays: csv, npy or npz (default csv).
 
     Mutually Inclusive:
         None
@@ -46,8 +46,8 @@ def execute(pcs: Process):
        TempFileTarget: Target scaler with .pkl format.
 
     Outfiles:
-        dataset_norm_features.csv
-        dataset_norm_target.csv
+        dataset_norm_features.csv (or .npy, .npz)
+        dataset_norm_target.csv (or .npy, .npz)
         scaler_features.pkl
         scaler_target.pkl
 
@@ -75,7 +75,7 @@ def execute(pcs: Process):
     container = client.containers.run(
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
-        command=f"--filepath '{local_file_path.name}' --delimiter '{input_file_delimiter}' ",
+        command=f"--filepath '{local_file_path.name}' --delimiter '{input_file_delimiter}' --output-format {output_format}",
         detach=True,
         tty=True,
     )
@@ -90,7 +90,9 @@ def execute(pcs: Process):
 
     # Outputs
     # prepare output
-    out_csv_features = Path(pcs.storage.local_dir, "dataset_norm_features.csv")
+    out_csv_features = Path(
+        pcs.storage.local_dir, f"dataset_norm_features.{output_format}"
+    )
     # send time to remote storage
     if not out_csv_features.is_file():
         raise FileNotFoundError(f"{out_csv_features} is missing")
@@ -104,7 +106,7 @@ def execute(pcs: Process):
     pcs.to_downstream(features_csv)
 
     # prepare output
-    out_csv_target = Path(pcs.storage.local_dir, "dataset_norm_target.csv")
+    out_csv_target = Path(pcs.storage.local_dir, f"dataset_norm_target.{output_format}")
     # send time to remote storage
     if not out_csv_target.is_file():
         raise FileNotFoundError(f"{out_csv_target} is missing")
@@ -28,7 +28,7 @@ class TempFileScaler(TempFile):
     pass
 
 
-def execute(pcs: Process):
+def execute(pcs: Process, batch_size: int = 256):
     f"""
 
     Name:
@@ -41,7 +41,7 @@ def execute(pcs: Process):
         Khaos Research Group
 
     Parameters:
-        None
+        * --batch_size (int) -> Number of windows predicted at once
 
     Mutually Inclusive:
         None
@@ -108,7 +108,7 @@ def execute(pcs: Process):
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
         command=f"--filepath-x '{local_file_path_features.name}' --filepath-y '{local_file_path_target.name}' --filepath-model '{local_file_path_model.name}' "
-        f"--filepath-scaler-y '{local_file_path_scaler.name}' --delimiter ';' ",
+        f"--filepath-scaler-y '{local_file_path_scaler.name}' --delimiter ';' --batch-size {batch_size}",
         detach=True,
         tty=True,
     )
@@ -18,7 +18,17 @@ class TempFileTarget(TempFile):
     pass
 
 
-def execute(pcs: Process, n_neurons: int, n_steps_in: int, n_steps_out: int):
+def execute(
+    pcs: Process,
+    n_neurons: int,
+    n_steps_in: int,
+    n_steps_out: int,
+    batch_size: int = 32,
+    epochs: int = 1000,
+    time_budget: float = 0,
+    cv_folds: int = 0,
+    cv_workers: int = 2,
+):
     f"""
 
     Name:
@@ -35,13 +45,18 @@ def execute(pcs: Process, n_neurons: int, n_steps_in: int, n_steps_out: int):
         * --n_neurons (int) -> Number of neurons for model building
         * --n_steps_in (int) -> Time window to train the model
         * --n_steps_out (int) -> Period of time to predict
+        * --batch_size (int) -> Number of windows per training batch
+        * --epochs (int) -> Maximum number of training epochs
+        * --time_budget (float) -> Seconds of training after which no new epoch is started, 0 for no limit
+        * --cv_folds (int) -> Number of rolling origin cross-validation folds trained before the model, 0 to skip it
+        * --cv_workers (int) -> Number of processes training cross-validation folds at the same time
 
     Mutually Inclusive:
         None
 
     Inputs:
         TempFile: X numpy array file.
-        SimpleTabularDataset: Y csv file.
+        SimpleTabularDataset: Y csv, npy or npz file.
 
     Outputs:
        TempFile: LSTM model.
@@ -52,6 +67,8 @@ def execute(pcs: Process, n_neurons: int, n_steps_in: int, n_steps_out: int):
         lstm_X_test.npy
         lstm_Y_test.npy
         lstm_model.hdf5
+        lstm_training_metrics.json
+        lstm_cv_metrics.csv (with cv_folds)
 
     """
 
@@ -86,7 +103,9 @@ def execute(pcs: Process, n_neurons: int, n_steps_in: int, n_steps_out: int):
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
         command=f"--filepath-x '{local_file_path_features.name}' --filepath-y '{local_file_path_target.name}' "
-        f"--n-neurons {n_neurons} --n-steps-in {n_steps_in} --n-steps-out {n_steps_out} --delimiter '{input_file_delimiter_target}' ",
+        f"--n-neurons {n_neurons} --n-steps-in {n_steps_in} --n-steps-out {n_steps_out} --delimiter '{input_file_delimiter_target}' "
+        f"--batch-size {batch_size} --epochs {epochs} --time-budget {time_budget} "
+        f"--cv-folds {cv_folds} --cv-workers {cv_workers}",
         detach=True,
         tty=True,
     )
@@ -136,4 +155,19 @@ def execute(pcs: Process, n_neurons: int, n_steps_in: int, n_steps_out: int):
     model_hdf5 = TempFile(resource=dfs_dir_model)
     pcs.to_downstream(model_hdf5)
 
-    return TaskResult(files=[dfs_dir_features, dfs_dir_target, dfs_dir_model])
+    # Training metrics are only stored
+    out_json_metrics = Path(pcs.storage.local_dir, "lstm_training_metrics.json")
+    if not out_json_metrics.is_file():
+        raise FileNotFoundError(f"{out_json_metrics} is missing")
+
+    dfs_dir_metrics = pcs.storage.put_file(out_json_metrics)
+    files = [dfs_dir_features, dfs_dir_target, dfs_dir_model, dfs_dir_metrics]
+
+    if cv_folds > 0:
+        out_csv_cv_metrics = Path(pcs.storage.local_dir, "lstm_cv_metrics.csv")
+        if not out_csv_cv_metrics.is_file():
+            raise FileNotFoundError(f"{out_csv_cv_metrics} is missing")
+
+        files.append(pcs.storage.put_file(out_csv_cv_metrics))
+
+    return TaskResult(files=files)
@@ -1,6 +1,7 @@
 import shutil
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 import docker
 from drama.core.model import SimpleTabularDataset, TempFile
@@ -13,7 +14,16 @@ class SimpleTabularDatasetTest(SimpleTabularDataset):
     pass
 
 
-def execute(pcs: Process, seasonality: int):
+def execute(
+    pcs: Process,
+    seasonality: int,
+    optimize: bool = False,
+    search: str = "grid",
+    workers: Optional[int] = None,
+    fit_timeout: float = 60,
+    cache_dir: str = "~/.cache/enbic2lab/sarimax",
+    warm_start: bool = False,
+):
     f"""
 
     Name:
@@ -27,6 +37,12 @@ def execute(pcs: Process, seasonality: int):
 
     Parameters:
         * --seasonality (int) -> Seasonality of the pollen type of the dataset
+        * --optimize (bool) -> Select the SARIMA order with the lowest AIC
+        * --search (str) -> Order search of --optimize, grid or stepwise
+        * --workers (int) -> Number of processes for the grid search, by default the CPUs available to the container
+        * --fit-timeout (float) -> Seconds allowed per grid search fit, 0 for no limit
+        * --cache-dir (str) -> Host directory of the SARIMAX fit cache, reused by later runs on the same data, empty to disable it
+        * --warm-start (bool) -> Seed the fits with the same orders of the previous Sarima_model.pkl or the fit cache when the series extends theirs
 
     Mutually Inclusive:
         None
@@ -61,14 +77,26 @@ def execute(pcs: Process, seasonality: int):
     if not in_csv.is_file():
         shutil.copyfile(local_file_path, in_csv)
 
+    volumes = {local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}}
+    cache_param = ""
+    if cache_dir:
+        local_cache_path = Path(cache_dir).expanduser()
+        local_cache_path.mkdir(parents=True, exist_ok=True)
+        volumes[local_cache_path] = {"bind": "/usr/local/src/cache", "mode": "rw"}
+        cache_param = "--cache-dir /usr/local/src/cache"
+
+    workers_param = f"--workers {workers} " if workers else ""
+
     # Docker
     image_name = "enbic2lab/air/sarima_model"
     # get docker image
     client = docker.from_env()
     container = client.containers.run(
         image=image_name,
-        volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
-        command=f"--filepath  '{local_file_path.name}' --seasonality {seasonality} --delimiter '{input_file_delimiter}' ",
+        volumes=volumes,
+        command=f"--filepath  '{local_file_path.name}' --seasonality {seasonality} --delimiter '{input_file_delimiter}' "
+        f"{'--optimize' if optimize else '--no-optimize'} --search {search} {workers_param}--fit-timeout {fit_timeout} "
+        f"{'--warm-start' if warm_start else '--no-warm-start'} {cache_param}",
         detach=True,
         tty=True,
     )
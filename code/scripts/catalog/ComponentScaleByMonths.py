@@ -1,5 +1,6 @@
 import shutil
 from pathlib import Path
+from typing import List, Optional
 
 import docker
 from drama.core.model import SimpleTabularDataset
@@ -7,7 +8,7 @@ from drama.models.task import TaskResult
 from drama.process import Process
 
 
-def execute(pcs: Process, date_column: str):
+def execute(pcs: Process, date_column: str, aggregation: Optional[List[str]] = None):
     f"""
 
     Name:
@@ -21,6 +22,7 @@ def execute(pcs: Process, date_column: str):
 
     Parameters:
         * --date_column (str) -> Name of the date column.
+        * --aggregation (List[str]) -> Monthly aggregation of some columns as column:function, with function sum, mean or max. Other columns are summed.
 
     Mutually Inclusive:
         None
@@ -51,6 +53,10 @@ def execute(pcs: Process, date_column: str):
     if not in_csv.is_file():
         shutil.copyfile(local_file_path, in_csv)
 
+    aggregation_param = " ".join(
+        f"--aggregation '{column}'" for column in aggregation or []
+    )
+
     # Docker
     image_name = "enbic2lab/air/scale_by_months"
     # get docker image
@@ -59,7 +65,7 @@ def execute(pcs: Process, date_column: str):
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
         command=f"--filepath  '{local_file_path.name}' --date-column '{date_column}' "
-        f"--delimiter '{input_file_delimiter}'",
+        f"--delimiter '{input_file_delimiter}' {aggregation_param}",
         detach=True,
         tty=True,
     )
@@ -8,7 +8,9 @@ from drama.models.task import TaskResult
 from drama.process import Process
 
 
-def execute(pcs: Process, n_steps_in: int, n_steps_out: int):
+def execute(
+    pcs: Process, n_steps_in: int, n_steps_out: int, output_format: str = "csv"
+):
     f"""
 
     Name:
@@ -23,13 +25,14 @@ def execute(pcs: Process, n_steps_in: int, n_steps_out: int):
     Parameters:
         * --n_steps_in (int) -> Select time window to train the model
         * --n_steps_out (int) -> Select period of time to predict
+        * --output_format (str) -> Format of the sequence target: csv, npy or npz (default csv)
 
     Mutually Inclusive:
         None
 
     Inputs:
-        SimpleTabularDataset: Features csv file.
-        SimpleTabularDatasetTarget: Target csv file.
+        SimpleTabularDataset: Features csv, npy or npz file.
+        SimpleTabularDatasetTarget: Target csv, npy or npz file.
 
     Outputs:
        TempFile: Sequence features (numpy array).
@@ -37,7 +40,7 @@ def execute(pcs: Process, n_steps_in: int, n_steps_out: int):
 
     Outfiles:
         sequence_X.npy
-        sequence_Y.csv
+        sequence_Y.csv (or .npy, .npz)
 
     """
 
@@ -73,7 +76,7 @@ def execute(pcs: Process, n_steps_in: int, n_steps_out: int):
         image=image_name,
         volumes={local_component_path: {"bind": "/usr/local/src/data", "mode": "rw"}},
         command=f"--filepath-features '{local_file_path_features.name}' --filepath-target '{local_file_path_target.name}' "
-        f"--n-steps-in {n_steps_in} --n-steps-out {n_steps_out} --delimiter '{input_file_delimiter_features}' ",
+        f"--n-steps-in {n_steps_in} --n-steps-out {n_steps_out} --delimiter '{input_file_delimiter_features}' --output-format {output_format}",
         detach=True,
         tty=True,
     )
@@ -100,7 +103,7 @@ def execute(pcs: Process, n_steps_in: int, n_steps_out: int):
     pcs.to_downstream(features_csv)
 
     # prepare output
-    out_csv_target = Path(pcs.storage.local_dir, "sequences_Y.csv")
+    out_csv_target = Path(pcs.storage.local_dir, f"sequences_Y.{output_format}")
     # send time to remote storage
     if not out_csv_target.is_file():
         raise FileNotFoundError(f"{out_csv_target} is missing")
@@ -0,0 +1,140 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Modules shared by several components are copied next to their scripts in the
+# docker images, import them from their source directory here
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "common"))
+
+
+class MockAemet(BaseHTTPRequestHandler):
+    """AEMET daily weather API answering one record per window, on the window
+    start date, through the datos URL of the first response
+
+    Each aemet_server fixture serves a subclass with its own state
+    """
+
+    VALUES = (
+        "tmed",
+        "prec",
+        "tmin",
+        "tmax",
+        "dir",
+        "velmedia",
+        "racha",
+        "sol",
+        "presMax",
+        "presMin",
+    )
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        try:
+            self._respond()
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+
+    def _respond(self):
+        cls = type(self)
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if "fechaini" in parts:
+            start = parts[parts.index("fechaini") + 1][:10]
+            end = parts[parts.index("fechafin") + 1][:10]
+            station = parts[parts.index("estacion") + 1]
+            with cls.lock:
+                cls.windows.append((start, end))
+                cls.requests.append((station, start, time.monotonic()))
+                unavailable = cls.unavailable.get(start, 0) > 0
+                if unavailable:
+                    cls.unavailable[start] -= 1
+            time.sleep(0.05)
+            if unavailable:
+                self._send(503, {"descripcion": "Servicio no disponible"})
+            elif start in cls.failing:
+                self._send(429, {"descripcion": "Limite de peticiones", "estado": 429})
+            else:
+                host = f"http://{self.headers['Host']}"
+                datos = f"{host}/datos/{station}/{start}"
+                self._send(200, {"estado": 200, "datos": datos})
+        else:
+            station, start = parts[-2:]
+            time.sleep(cls.delays.get(start, 0) + cls.delays.get(station, 0))
+            record = {"fecha": start, "indicativo": station}
+            record.update({value: "1,5" for value in self.VALUES})
+            self._send(200, [record])
+
+    def _send(self, status, body):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def aemet_server():
+    """Local mock AEMET API, its url attribute is the --base-url of the components
+
+    failing - window start dates answering 429 without a datos URL
+    unavailable - {window start date: number of 503 answers before a success}
+    delays - seconds the datos response of a window start date or station waits
+    windows, requests - (start, end) and (station, start, time) of every request
+    max_in_flight - highest number of requests served at the same time
+    """
+    handler = type(
+        "MockAemetServer",
+        (MockAemet,),
+        {
+            "failing": set(),
+            "unavailable": {},
+            "delays": {},
+            "windows": [],
+            "requests": [],
+            "lock": threading.Lock(),
+            "in_flight": 0,
+            "max_in_flight": 0,
+        },
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    handler.url = f"http://127.0.0.1:{server.server_address[1]}/opendata/api/"
+    yield handler
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def monthly_pollen():
+    """Factory of monthly pollen-like series, a spring peak scaled by a random
+    yearly intensity plus AR(1) noise
+    """
+
+    def make(seed=0, years=12):
+        rng = np.random.default_rng(seed)
+        n = 12 * years
+        month = np.arange(n) % 12
+        season = 400 * np.exp(-0.5 * (month - 3) ** 2)
+        noise = np.zeros(n)
+        for t in range(1, n):
+            noise[t] = 0.6 * noise[t - 1] + rng.normal(0, 40)
+        intensity = 1 + 0.3 * rng.normal(size=years).repeat(12)
+        values = np.maximum(season * intensity + noise, 0)
+        return pd.Series(values, index=pd.date_range("2000-01", periods=n, freq="MS"))
+
+    return make
@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The statistics script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "DatasetStatistics"))
+from aemet_add_statistics import rolling_statistics  # noqa: E402
+
+
+def expected_statistic(values, row, window, mean):
+    # Row by row statistic of the original implementation, empty for the first
+    # `window` rows
+    if row < window:
+        return np.nan
+    total = sum(values[row - window + 1 : row + 1])
+    return round(total / window if mean else total, 3)
+
+
+@pytest.mark.parametrize("rows", range(6))
+def test_short_series(rows):
+    values = [0.1234 * (row + 1) for row in range(rows)]
+    dataframe = pd.DataFrame({"prec": values})
+
+    statistics = rolling_statistics(dataframe, ["prec"], ["prec"], [3, 5])
+
+    assert len(statistics) == rows
+    for window in (3, 5):
+        for name, mean in ((f"prec_acum_{window}", False), (f"prec_MM{window}", True)):
+            expected = [
+                expected_statistic(values, row, window, mean) for row in range(rows)
+            ]
+            np.testing.assert_array_equal(statistics[name].to_numpy(), expected)
+
+
+def test_accumulated_3_rows_rounded_to_2_decimals_from_the_sixth_row():
+    values = [0.1234 * (row + 1) for row in range(7)]
+    dataframe = pd.DataFrame({"prec": values})
+
+    statistics = rolling_statistics(dataframe, ["prec"], [], [3])
+
+    assert statistics["prec_acum_3"].iloc[3:].tolist() == [
+        round(sum(values[1:4]), 3),
+        round(sum(values[2:5]), 3),
+        round(sum(values[3:6]), 2),
+        round(sum(values[4:7]), 2),
+    ]
@@ -0,0 +1,54 @@
+import json
+from datetime import date
+
+import pytest
+
+from aemet_cache import AemetCache, get_cached, put_cached
+
+START, END = date(2019, 1, 1), date(2019, 12, 31)
+
+
+def test_closed_window_round_trip(tmp_path):
+    cache = AemetCache(tmp_path, ttl=3600, max_size_mb=1)
+    cache.put("6155A", START, END, [{"fecha": "2019-01-01", "prec": "0,0"}])
+
+    assert cache.get("6155A", START, END) == [{"fecha": "2019-01-01", "prec": "0,0"}]
+    assert cache.get("6155A", START, date(2019, 6, 30)) is None
+    # Only the entry is left, no temporary file
+    assert [path.suffix for path in tmp_path.iterdir()] == [".json"]
+
+
+@pytest.mark.parametrize(
+    "entry", ['{"data": [1]}', '{"expires": null}', "[1, 2]", '{"expires": nul']
+)
+def test_truncated_or_legacy_entry_is_a_miss(tmp_path, entry):
+    cache = AemetCache(tmp_path, ttl=3600, max_size_mb=1)
+    cache._path("6155A", START, END).write_text(entry)
+
+    assert cache.get("6155A", START, END) is None
+
+
+def test_expired_entry_is_removed(tmp_path):
+    cache = AemetCache(tmp_path, ttl=3600, max_size_mb=1)
+    path = cache._path("6155A", START, END)
+    path.write_text(json.dumps({"expires": 0, "data": [1]}))
+
+    assert cache.get("6155A", START, END) is None
+    assert not path.exists()
+
+
+def test_disabled_cache_helpers():
+    assert get_cached(None, "6155A", START, END) is None
+    assert put_cached(None, "6155A", START, END, [1]) == [1]
+
+
+def test_error_payloads_are_not_cached(tmp_path):
+    cache = AemetCache(tmp_path, ttl=3600, max_size_mb=1)
+
+    put_cached(cache, "6155A", START, END, {"estado": 404})
+    put_cached(cache, "6155A", START, date(2019, 6, 30), [{"fecha": "2019-01-01"}])
+
+    assert get_cached(cache, "6155A", START, END) is None
+    assert get_cached(cache, "6155A", START, date(2019, 6, 30)) == [
+        {"fecha": "2019-01-01"}
+    ]
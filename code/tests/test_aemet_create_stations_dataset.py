@@ -0,0 +1,130 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+import typer
+from typer.testing import CliRunner
+
+# The dataset script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "StationsAttibute"))
+from aemet_create_stations_dataset import aemet_create_stations_dataset  # noqa: E402
+
+STATIONS = [
+    [
+        {
+            "fecha": "2020-01-01",
+            "indicativo": "6155A",
+            "prec": "1,5",
+            "tmed": "10,1",
+            "sol": "7,2",
+        },
+        {"fecha": "2020-01-02", "indicativo": "6155A", "prec": "Ip", "tmed": "11,0"},
+        {
+            "fecha": "2020-01-03",
+            "indicativo": "6155A",
+            "prec": "0,0",
+            "tmed": "9,8",
+            "sol": "8,0",
+        },
+        {"fecha": "2020-01-02", "indicativo": "6155A", "prec": "2,4", "tmed": "11,2"},
+    ],
+    [
+        {
+            "fecha": "2020-01-02",
+            "indicativo": "6156X",
+            "prec": "3,0",
+            "tmed": "12,5",
+            "sol": "6,1",
+        },
+        {"fecha": "2020-01-04", "indicativo": "6156X", "tmed": "13,0", "sol": "5,5"},
+        {"fecha": "2020-01-01", "indicativo": "6156X", "prec": "Ip", "tmed": "12,0"},
+    ],
+    [],
+    [
+        {
+            "fecha": "2020-01-03",
+            "indicativo": "6172O",
+            "prec": "12,7",
+            "tmed": "8,5",
+            "sol": "0,3",
+        },
+        {"fecha": "2020-01-03", "indicativo": "6172O", "tmed": "8,7"},
+        {
+            "fecha": "2020-01-01",
+            "indicativo": "6155A",
+            "prec": "0,2",
+            "tmed": "10,3",
+            "sol": "7,4",
+        },
+    ],
+]
+
+# Files written by the original record by record implementation, one run per
+# attribute: repeated records keep the last value, even a missing one
+EXPECTED = {
+    "prec": """\
+6155A;DATE;6156X;6172O
+0.2;2020-01-01;0.0;
+2.4;2020-01-02;3.0;
+0.0;2020-01-03;;
+;2020-01-04;;
+""",
+    "tmed": """\
+6155A;DATE;6156X;6172O
+10.3;2020-01-01;12.0;
+11.2;2020-01-02;12.5;
+9.8;2020-01-03;;8.7
+;2020-01-04;13.0;
+""",
+    "sol": """\
+6155A;DATE;6156X;6172O
+7.4;2020-01-01;;
+;2020-01-02;6.1;
+8.0;2020-01-03;;
+;2020-01-04;5.5;
+""",
+}
+
+
+@pytest.mark.parametrize("batch_size", [2, 3, 100000])
+def test_csv_files_match_the_original_implementation(tmp_path, monkeypatch, batch_size):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "stations.json").write_text(json.dumps(STATIONS))
+    monkeypatch.chdir(tmp_path)
+
+    aemet_create_stations_dataset(
+        json_file="stations.json",
+        attribute=["prec", "tmed", "sol", "prec"],
+        delimiter=";",
+        batch_size=batch_size,
+    )
+
+    for attribute, expected in EXPECTED.items():
+        path = tmp_path / "data" / f"Aemet_{attribute}_stations.csv"
+        assert path.read_text() == expected
+
+
+def test_empty_batches_are_rejected(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "data" / "stations.json").write_text(json.dumps(STATIONS))
+    monkeypatch.chdir(tmp_path)
+    app = typer.Typer()
+    app.command()(aemet_create_stations_dataset)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--json-file",
+            "stations.json",
+            "--attribute",
+            "prec",
+            "--delimiter",
+            ";",
+            "--batch-size",
+            "0",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert not (tmp_path / "data" / "Aemet_prec_stations.csv").exists()
@@ -0,0 +1,112 @@
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import typer
+from typer.testing import CliRunner
+
+# The download script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "AemetDownload"))
+from AemetDownloadData import aemet_download_data  # noqa: E402
+
+
+@pytest.mark.parametrize("max_concurrency", [1, 2])
+def test_windows_merged_in_date_order_with_failures(
+    aemet_server, tmp_path, monkeypatch, capsys, max_concurrency
+):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    aemet_server.failing.add("2013-01-01")
+    # Earlier windows answer later, so they finish out of date order
+    aemet_server.delays.update(
+        {"2010-01-01": 0.3, "2016-01-01": 0.2, "2019-01-01": 0.1}
+    )
+
+    aemet_download_data(
+        station="6155A",
+        start_date="2010-01-01",
+        end_date="2020-12-31",
+        aemet_api_key="key",
+        delimiter=";",
+        max_concurrency=max_concurrency,
+        base_url=aemet_server.url,
+        cache_dir=None,
+        cache_ttl=86400,
+        cache_max_size=512,
+        incremental=False,
+    )
+
+    dataframe = pd.read_csv(
+        tmp_path / "data" / "6155A_aemet_data.csv", sep=";", dtype=str
+    )
+    assert dataframe["fecha"].tolist() == ["2010-01-01", "2016-01-01", "2019-01-01"]
+    assert (
+        "Warning in station 6155A at start date 2013-01-01" in capsys.readouterr().out
+    )
+    assert aemet_server.max_in_flight == max_concurrency
+
+
+def test_incremental_without_manifest_downloads_the_gaps_of_the_file(
+    aemet_server, tmp_path, monkeypatch
+):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    days = ["2020-01-0" + str(day) for day in (1, 2, 3, 6, 7, 8, 9)]
+    legacy = pd.DataFrame(
+        {"fecha": days, **{value: "1.5" for value in aemet_server.VALUES}}
+    )
+    legacy.to_csv(tmp_path / "data" / "6155A_aemet_data.csv", sep=";", index=False)
+
+    aemet_download_data(
+        station="6155A",
+        start_date="2020-01-01",
+        end_date="2020-01-09",
+        aemet_api_key="key",
+        delimiter=";",
+        max_concurrency=2,
+        base_url=aemet_server.url,
+        cache_dir=None,
+        cache_ttl=86400,
+        cache_max_size=512,
+        incremental=True,
+    )
+
+    assert aemet_server.windows == [("2020-01-04", "2020-01-05")]
+    dataframe = pd.read_csv(
+        tmp_path / "data" / "6155A_aemet_data.csv", sep=";", dtype=str
+    )
+    assert dataframe["fecha"].tolist() == sorted(days + ["2020-01-04"])
+    manifest = json.loads(
+        (tmp_path / "data" / "6155A_aemet_data_manifest.json").read_text()
+    )
+    assert manifest["ranges"] == [["2020-01-01", "2020-01-09"]]
+
+
+def test_max_concurrency_below_one_is_rejected(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    app = typer.Typer()
+    app.command()(aemet_download_data)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--station",
+            "6155A",
+            "--start-date",
+            "2020-01-01",
+            "--end-date",
+            "2020-01-09",
+            "--aemet-api-key",
+            "key",
+            "--delimiter",
+            ";",
+            "--max-concurrency",
+            "0",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert not list((tmp_path / "data").iterdir())
@@ -0,0 +1,152 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import pytest
+import typer
+from typer.testing import CliRunner
+
+# The stations script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "AemetStations"))
+from aemet_station_weather_attributes import (  # noqa: E402
+    HostRateLimiter,
+    aemet_station_weather_attributes,
+)
+
+STATIONS = ["6155A", "6156X", "6172O"]
+
+
+def download(aemet_server, tmp_path, monkeypatch, **options):
+    (tmp_path / "data").mkdir(exist_ok=True)
+    monkeypatch.chdir(tmp_path)
+    arguments = {
+        "aemet_api_key": "key",
+        "start_date": "2014-01-01",
+        "end_date": "2020-12-31",
+        "analysis_stations": STATIONS,
+        "parallel": True,
+        "max_concurrency": 4,
+        "requests_per_second": 0,
+        "max_retries": 3,
+        "backoff": 0.1,
+        "base_url": aemet_server.url,
+        "cache_dir": None,
+        "cache_ttl": 86400,
+        "cache_max_size": 512,
+    }
+    arguments.update(options)
+    aemet_station_weather_attributes(**arguments)
+    with open(tmp_path / "data" / "stations_weather_attributes.json") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("parallel", [True, False])
+def test_stations_and_windows_keep_their_order(
+    aemet_server, tmp_path, monkeypatch, parallel
+):
+    # The first stations answer last in parallel mode
+    aemet_server.delays.update({"6155A": 0.3, "6156X": 0.15})
+
+    stations = download(aemet_server, tmp_path, monkeypatch, parallel=parallel)
+
+    assert [
+        [(r["indicativo"], r["fecha"]) for r in records] for records in stations
+    ] == [
+        [(station, start) for start in ("2014-01-01", "2017-01-01", "2020-01-01")]
+        for station in STATIONS
+    ]
+
+
+def test_unavailable_windows_are_retried_with_backoff(
+    aemet_server, tmp_path, monkeypatch
+):
+    aemet_server.unavailable["2017-01-01"] = 2
+
+    stations = download(
+        aemet_server, tmp_path, monkeypatch, analysis_stations=["6155A"], max_retries=2
+    )
+
+    assert [record["fecha"] for record in stations[0]] == [
+        "2014-01-01",
+        "2017-01-01",
+        "2020-01-01",
+    ]
+    attempts = [t for _, start, t in aemet_server.requests if start == "2017-01-01"]
+    assert len(attempts) == 3
+    # Backoff of 0.1 s doubled per attempt, on top of the 503 responses
+    assert attempts[1] - attempts[0] >= 0.1
+    assert attempts[2] - attempts[1] >= 0.2
+
+
+def test_window_is_reported_when_retries_run_out(
+    aemet_server, tmp_path, monkeypatch, capsys
+):
+    aemet_server.unavailable["2017-01-01"] = 3
+
+    stations = download(
+        aemet_server, tmp_path, monkeypatch, analysis_stations=["6155A"], max_retries=2
+    )
+
+    assert [record["fecha"] for record in stations[0]] == ["2014-01-01", "2020-01-01"]
+    assert (
+        "Warning in station 6155A at start date 2017-01-01: "
+        "Giving up after 3 attempts: HTTP 503" in capsys.readouterr().out
+    )
+
+
+def test_requests_to_the_host_are_spaced(aemet_server, tmp_path, monkeypatch):
+    download(aemet_server, tmp_path, monkeypatch, requests_per_second=10)
+
+    times = sorted(t for _, _, t in aemet_server.requests)
+    assert len(times) == 9
+    # Datos requests take slots of the same host between these requests
+    assert all(later - earlier >= 0.09 for earlier, later in zip(times, times[1:]))
+
+
+def test_rate_limiter_spaces_each_host_separately():
+    async def wait_all():
+        limiter = HostRateLimiter(20)
+        start = time.monotonic()
+        await asyncio.gather(
+            *(
+                limiter.wait(f"http://{host}/datos")
+                for host in ("a.example", "b.example")
+                for _ in range(5)
+            )
+        )
+        return time.monotonic() - start
+
+    # 5 requests per host at 20 per second, the two hosts do not wait for
+    # each other
+    assert 0.19 <= asyncio.run(wait_all()) < 0.35
+
+
+@pytest.mark.parametrize(
+    "option", [["--max-concurrency", "0"], ["--max-retries", "-1"]]
+)
+def test_out_of_range_options_are_rejected(tmp_path, monkeypatch, option):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    app = typer.Typer()
+    app.command()(aemet_station_weather_attributes)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--aemet-api-key",
+            "key",
+            "--start-date",
+            "2020-01-01",
+            "--end-date",
+            "2020-01-09",
+            "--analysis-stations",
+            "6155A",
+            "--parallel",
+            *option,
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert not list((tmp_path / "data").iterdir())
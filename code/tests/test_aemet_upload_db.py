@@ -0,0 +1,121 @@
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import mongomock
+import typer
+from pymongo import UpdateOne
+from typer.testing import CliRunner
+
+# The upload script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "Upload2DB"))
+import aemet_upload_db  # noqa: E402
+from aemet_upload_db import upsert_operations  # noqa: E402
+
+
+def test_repeated_dates_are_merged_in_file_order():
+    batch = [
+        {"fecha": "2020-01-01", "indicativo": "6155A", "tmed": "10,1"},
+        {"fecha": "2020-01-02", "indicativo": "6155A", "tmed": "11,0"},
+        {"fecha": "2020-01-01", "tmed": "12,3", "prec": "0,0"},
+    ]
+
+    operations = upsert_operations(batch)
+
+    assert operations == [
+        UpdateOne(
+            {"fecha": datetime(2020, 1, 1)},
+            {
+                "$set": {
+                    "fecha": datetime(2020, 1, 1),
+                    "indicativo": "6155A",
+                    "tmed": "12,3",
+                    "prec": "0,0",
+                }
+            },
+            upsert=True,
+        ),
+        UpdateOne(
+            {"fecha": datetime(2020, 1, 2)},
+            {
+                "$set": {
+                    "fecha": datetime(2020, 1, 2),
+                    "indicativo": "6155A",
+                    "tmed": "11,0",
+                }
+            },
+            upsert=True,
+        ),
+    ]
+
+
+def test_upload_merges_dates_repeated_across_batches(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    records = [
+        {"fecha": "2020-01-01", "indicativo": "6155A", "tmed": "10,1"},
+        {"fecha": "2020-01-02", "indicativo": "6155A", "tmed": "11,0"},
+        {"fecha": "2020-01-03", "indicativo": "6155A", "tmed": "9,4"},
+        {"fecha": "2020-01-01", "indicativo": "6155A", "tmed": "12,3"},
+    ]
+    (tmp_path / "data" / "stations.json").write_text(json.dumps([records]))
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(aemet_upload_db, "MongoClient", lambda *args, **kwargs: client)
+    monkeypatch.chdir(tmp_path)
+
+    aemet_upload_db.aemet_upload_db(
+        input_filepath="stations.json",
+        user="user",
+        password="password",
+        path="mongodb://localhost",
+        database="aemet",
+        collection="weather",
+        batch_size=2,
+        ordered=False,
+    )
+
+    collection = client["aemet"]["weather"]
+    documents = {
+        document["fecha"]: document["tmed"]
+        for document in collection.find({}, {"_id": False})
+    }
+    assert collection.count_documents({}) == 3
+    assert documents == {
+        datetime(2020, 1, 1): "12,3",
+        datetime(2020, 1, 2): "11,0",
+        datetime(2020, 1, 3): "9,4",
+    }
+    assert any(
+        index["key"] == [("fecha", 1)]
+        for index in collection.index_information().values()
+    )
+
+
+def test_empty_batches_are_rejected(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    app = typer.Typer()
+    app.command()(aemet_upload_db.aemet_upload_db)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--input-filepath",
+            "stations.json",
+            "--user",
+            "user",
+            "--password",
+            "password",
+            "--path",
+            "mongodb://localhost",
+            "--database",
+            "aemet",
+            "--collection",
+            "weather",
+            "--batch-size",
+            "0",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "--batch-size" in result.output
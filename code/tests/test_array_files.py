@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from array_files import OUTPUT_FORMATS, load_array, save_array
+
+
+@pytest.mark.parametrize("output_format", OUTPUT_FORMATS)
+def test_round_trip(tmp_path, output_format):
+    array = np.arange(12, dtype=float).reshape(4, 3) / 7
+    path = (tmp_path / "sequences").with_suffix("." + output_format)
+
+    save_array(path, array, ";")
+    loaded = load_array(str(path), ";")
+
+    np.testing.assert_allclose(loaded, array, rtol=1e-15)
+
+
+def test_npy_is_memory_mapped(tmp_path):
+    path = tmp_path / "sequences.npy"
+    save_array(path, np.ones((3, 2)), ";")
+
+    assert isinstance(load_array(str(path), ";"), np.memmap)
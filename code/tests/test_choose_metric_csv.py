@@ -0,0 +1,170 @@
+import math
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+import typer
+from typer.testing import CliRunner
+
+# The selection script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "DataControlSelection"))
+import choose_metric_csv  # noqa: E402
+from choose_metric_csv import (  # noqa: E402
+    PublishMode,
+    parse_weights,
+    publish,
+    rank_candidates,
+)
+
+nan = math.nan
+
+
+def metrics_frame(rows):
+    return pd.DataFrame(
+        rows, columns=["filename", "r2_mean", "mae_mean", "rmse_mean", "rmse_mae_mean"]
+    )
+
+
+def test_votes_then_r2_then_file_order():
+    metrics = metrics_frame(
+        [
+            ["a", 0.9, 2.0, 3.0, 1.5],
+            ["b", 0.8, 1.0, 2.0, 1.4],
+            ["c", 0.7, 3.0, 4.0, 1.2],
+        ]
+    )
+
+    ranking = rank_candidates(metrics)
+
+    # b wins mae and rmse, a and c tie on one vote and a has the higher r2
+    assert ranking["filename"].tolist() == ["b", "a", "c"]
+    assert ranking["votes"].tolist() == [2.0, 1.0, 1.0]
+
+
+def test_weights_change_the_winner():
+    metrics = metrics_frame(
+        [
+            ["a", 0.9, 2.0, 3.0, 1.5],
+            ["b", 0.8, 1.0, 2.0, 1.4],
+        ]
+    )
+
+    ranking = rank_candidates(
+        metrics, {"r2_mean": 3.0, "mae_mean": 1.0, "rmse_mean": 1.0}
+    )
+
+    assert ranking["filename"].tolist() == ["a", "b"]
+    assert ranking["votes"].tolist() == [3.0, 2.0]
+
+
+def test_missing_values_never_win_and_rank_last_on_ties():
+    metrics = metrics_frame(
+        [
+            ["a", nan, nan, 3.0, nan],
+            ["b", 0.5, nan, nan, nan],
+            ["c", nan, nan, 2.0, nan],
+            ["d", 0.5, nan, 4.0, nan],
+        ]
+    )
+
+    ranking = rank_candidates(metrics)
+
+    # mae_mean and rmse_mae_mean do not vote, the r2 vote tied between b and d
+    # goes to the first in file order and a missing r2 ranks after any value
+    assert ranking["filename"].tolist() == ["b", "c", "d", "a"]
+    assert ranking["votes"].tolist() == [1.0, 1.0, 0.0, 0.0]
+
+
+def test_no_metric_value_at_all_is_rejected():
+    metrics = metrics_frame([["a", nan, nan, nan, nan], ["b", nan, nan, nan, nan]])
+
+    with pytest.raises(ValueError, match="No values"):
+        rank_candidates(metrics)
+
+
+def test_unknown_metric_is_rejected_by_the_ranking():
+    metrics = metrics_frame([["a", 0.9, 2.0, 3.0, 1.5]])
+
+    with pytest.raises(ValueError, match="Unknown metric"):
+        rank_candidates(metrics, {"r2": 1.0})
+
+
+def test_parse_weights():
+    assert parse_weights(["r2_mean:2", "mae_mean:0", "r2_mean:0.5"]) == {
+        "r2_mean": 0.5,
+        "mae_mean": 0.0,
+    }
+
+
+@pytest.mark.parametrize(
+    "entry",
+    ["r2_mean", "r2:1", "r2_mean:-1", "r2_mean:nan", "r2_mean:inf", "r2_mean:high"],
+)
+def test_bad_weights_are_rejected(entry):
+    with pytest.raises(typer.BadParameter):
+        parse_weights([entry])
+
+
+@pytest.fixture
+def candidate(tmp_path):
+    source = tmp_path / "mean.csv"
+    source.write_text("fecha;tmed\n2020-01-01;10.1\n")
+    target = tmp_path / "best_mean.csv"
+    # A stale file of a previous run is replaced
+    target.write_text("stale")
+    return source, target
+
+
+def test_publish_hard_link(candidate):
+    source, target = candidate
+
+    publish(source, target)
+
+    assert os.path.samefile(source, target)
+    assert target.read_text() == "fecha;tmed\n2020-01-01;10.1\n"
+
+
+def test_publish_copies_where_links_fail(candidate, monkeypatch):
+    source, target = candidate
+
+    def unsupported(source, target):
+        raise OSError("links not supported")
+
+    monkeypatch.setattr(choose_metric_csv.os, "link", unsupported)
+    publish(source, target)
+
+    assert not os.path.samefile(source, target)
+    assert target.read_text() == source.read_text()
+
+
+def test_publish_rename(candidate):
+    source, target = candidate
+
+    publish(source, target, PublishMode.rename)
+
+    assert not source.exists()
+    assert target.read_text() == "fecha;tmed\n2020-01-01;10.1\n"
+
+
+def test_unknown_publish_mode_is_rejected_before_reading(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    app = typer.Typer()
+    app.command()(choose_metric_csv.choose_metric_csv)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--filepath-metrics",
+            "metrics.csv",
+            "--delimiter",
+            ";",
+            "--publish-mode",
+            "copy",
+        ],
+    )
+
+    # Rejected by the option itself, before changing to the data directory
+    assert result.exit_code == 2
+    assert Path.cwd() == tmp_path
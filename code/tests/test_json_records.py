@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from json_records import iter_json_records
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_records_of_nested_lists_across_chunks(tmp_path, chunk_size):
+    stations = [
+        [
+            {
+                "fecha": "2020-01-01",
+                "indicativo": "6155A",
+                "nombre": "MÁLAGA, [AEROPUERTO]",
+            }
+        ],
+        [],
+        [
+            {"fecha": "2020-01-01", "indicativo": "6156X", "prec": "Ip"},
+            {"fecha": "2020-01-02"},
+        ],
+    ]
+    path = tmp_path / "stations.json"
+    path.write_text(json.dumps(stations, indent=2, ensure_ascii=False), encoding="utf8")
+
+    records = list(iter_json_records(path, chunk_size=chunk_size))
+
+    assert records == [record for station in stations for record in station]
+
+
+def test_unexpected_value_is_rejected(tmp_path):
+    path = tmp_path / "stations.json"
+    path.write_text('[{"fecha": "2020-01-01"}, 3]')
+
+    with pytest.raises(ValueError, match="Unexpected character"):
+        list(iter_json_records(path))
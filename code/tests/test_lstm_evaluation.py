@@ -0,0 +1,130 @@
+import pickle
+import sys
+from pathlib import Path
+
+import keras
+import numpy as np
+import pandas as pd
+import pytest
+import typer
+from sklearn.preprocessing import MinMaxScaler
+from typer.testing import CliRunner
+
+# The evaluation script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "LstmEvaluation"))
+from lstm_evaluation import lstm_evaluation, output_names  # noqa: E402
+
+
+def lstm(seed):
+    keras.utils.set_random_seed(seed)
+    return keras.Sequential(
+        [
+            keras.Input((4, 2)),
+            keras.layers.LSTM(3, return_sequences=True),
+            keras.layers.Dense(1),
+        ]
+    )
+
+
+@pytest.fixture
+def evaluation_data(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.chdir(tmp_path)
+    rng = np.random.default_rng(0)
+    X_test = rng.random((10, 4, 2)).astype("float32")
+    y_test = rng.random((10, 4))
+    np.save(data / "X_test.npy", X_test)
+    np.save(data / "Y_test.npy", y_test)
+    scaler = MinMaxScaler().fit(rng.random((20, 1)) * 50)
+    with open(data / "scaler_target.pkl", "wb") as f:
+        pickle.dump(scaler, f)
+    return data, X_test, y_test, scaler
+
+
+def test_output_names_keep_dotted_stems_and_number_repeated_ones():
+    assert output_names(["a/model.v1.h5", "a/model.v2.h5"]) == ["model.v1", "model.v2"]
+    assert output_names(["a/model.h5", "b/model.h5", "best.h5"]) == [
+        "model_1",
+        "model_2",
+        "best",
+    ]
+
+
+@pytest.mark.parametrize(
+    "model_paths",
+    [
+        ["model.h5", "model.h5"],
+        ["a/model.h5", "b/model.h5", "model_1.h5"],
+    ],
+)
+def test_clashing_output_names_are_rejected(model_paths):
+    with pytest.raises(typer.BadParameter):
+        output_names(model_paths)
+
+
+def test_several_checkpoints_of_one_architecture(evaluation_data):
+    data, X_test, y_test, scaler = evaluation_data
+    # Stems with dots must not be cut at the first dot and overwrite each other
+    models = {"lstm.epoch.1.h5": lstm(1), "lstm.epoch.2.h5": lstm(2)}
+    for filename, model in models.items():
+        model.save(data / filename)
+
+    lstm_evaluation(
+        filepath_X="X_test.npy",
+        filepath_Y="Y_test.npy",
+        filepath_model=list(models),
+        filepath_scaler_y="scaler_target.pkl",
+        delimiter=";",
+        batch_size=3,
+    )
+
+    test_inv = scaler.inverse_transform(y_test[:, -1:])
+    for filename, model in models.items():
+        stem = filename[: -len(".h5")]
+        expected = scaler.inverse_transform(model.predict(X_test, verbose=0)[:, -1])
+        predictions = np.loadtxt(data / f"lstm_predictions_{stem}.csv", delimiter=";")
+        np.testing.assert_allclose(predictions, expected.ravel(), rtol=1e-5)
+        metrics = pd.read_csv(data / f"lstm_metrics_{stem}.csv", sep=";", index_col=0)
+        assert metrics.loc["MAE", "Value"] == pytest.approx(
+            np.abs(test_inv - expected).mean(), rel=1e-5
+        )
+
+    models_metrics = pd.read_csv(data / "lstm_models_metrics.csv", sep=";")
+    assert models_metrics["model"].tolist() == list(models)
+    assert sorted(path.name for path in data.glob("lstm_*.csv")) == [
+        "lstm_metrics_lstm.epoch.1.csv",
+        "lstm_metrics_lstm.epoch.2.csv",
+        "lstm_models_metrics.csv",
+        "lstm_predictions_lstm.epoch.1.csv",
+        "lstm_predictions_lstm.epoch.2.csv",
+    ]
+
+
+def test_clashing_models_are_rejected_before_writing(evaluation_data):
+    data = evaluation_data[0]
+    app = typer.Typer()
+    app.command()(lstm_evaluation)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--filepath-x",
+            "X_test.npy",
+            "--filepath-y",
+            "Y_test.npy",
+            "--filepath-model",
+            "a/model.h5",
+            "--filepath-model",
+            "b/model.h5",
+            "--filepath-model",
+            "model_1.h5",
+            "--filepath-scaler-y",
+            "scaler_target.pkl",
+            "--delimiter",
+            ";",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert not list(data.glob("lstm_*.csv"))
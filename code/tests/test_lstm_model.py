@@ -0,0 +1,183 @@
+import json
+import sys
+from pathlib import Path
+
+import keras
+import numpy as np
+import pytest
+
+# The model script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "LstmModel"))
+import lstm_model  # noqa: E402
+from lstm_model import (  # noqa: E402
+    TrainingMonitor,
+    WindowSequence,
+    rolling_origin_folds,
+    split_train_test,
+    train_model,
+)
+
+
+@pytest.fixture
+def windows(tmp_path):
+    X = np.arange(10 * 4 * 2, dtype="float32").reshape(10, 4, 2)
+    y = np.arange(10 * 3, dtype="float32").reshape(10, 3)
+    np.save(tmp_path / "X.npy", X)
+    np.save(tmp_path / "Y.npy", y)
+    return (
+        np.load(tmp_path / "X.npy", mmap_mode="r"),
+        np.load(tmp_path / "Y.npy", mmap_mode="r"),
+    )
+
+
+@pytest.mark.parametrize("batch_size, batches", [(3, 4), (5, 2), (32, 1)])
+def test_window_sequence_covers_every_window_once(windows, batch_size, batches):
+    X, y = windows
+
+    sequence = WindowSequence(X, y, batch_size)
+
+    assert len(sequence) == batches
+    X_batches, y_batches = zip(*(sequence[index] for index in range(len(sequence))))
+    assert [len(batch) for batch in X_batches[:-1]] == [batch_size] * (batches - 1)
+    np.testing.assert_array_equal(np.concatenate(X_batches), X)
+    np.testing.assert_array_equal(np.concatenate(y_batches), y)
+
+
+def test_window_sequence_reads_memory_mapped_batches_into_memory(windows):
+    X, y = windows
+
+    X_batch, y_batch = WindowSequence(X, y, 4)[1]
+
+    # Keras gets in-memory arrays of the windows 4 to 7 only
+    assert type(X_batch) is np.ndarray and type(y_batch) is np.ndarray
+    np.testing.assert_array_equal(X_batch, X[4:8])
+    np.testing.assert_array_equal(y_batch, y[4:8])
+
+
+class Clock:
+    # perf_counter returning the given times, one per call, then the last one
+    def __init__(self, *times):
+        self.times = list(times)
+
+    def __call__(self):
+        return self.times.pop(0) if len(self.times) > 1 else self.times[0]
+
+
+def run_epochs(monitor, epochs, stop_after=None):
+    # Drive the callback as Keras fit does, stop_after mimics early stopping
+    monitor.set_model(keras.Sequential())
+    monitor.model.stop_training = False
+    monitor.on_train_begin()
+    for epoch in range(epochs):
+        monitor.on_epoch_begin(epoch)
+        if epoch + 1 == stop_after:
+            monitor.model.stop_training = True
+        monitor.on_epoch_end(epoch, {"loss": 1.0 / (epoch + 1)})
+        if monitor.model.stop_training:
+            break
+    monitor.on_train_end()
+
+
+def test_time_budget_stops_before_an_epoch_would_exceed_it(tmp_path, monkeypatch):
+    # Train begin, then epoch begin, epoch end and metrics write of each epoch
+    # taking 10 seconds
+    clock = Clock(0, 0, 10, 10, 10, 20, 20)
+    monkeypatch.setattr(lstm_model.time, "perf_counter", clock)
+    metrics_path = tmp_path / "metrics.json"
+    monitor = TrainingMonitor(100, str(metrics_path), 32, time_budget=25)
+
+    run_epochs(monitor, 5)
+
+    # After 20 seconds a third epoch would end at 30
+    metrics = json.loads(metrics_path.read_text())
+    assert metrics["stop_reason"] == "time_budget"
+    assert metrics["epochs_run"] == 2
+    assert [epoch["epoch"] for epoch in metrics["epochs"]] == [1, 2]
+    assert metrics["mean_epoch_time"] == pytest.approx(10)
+    assert metrics["samples_per_second"] == pytest.approx(10)
+    assert metrics["total_time"] == pytest.approx(20)
+    assert metrics["epochs"][1]["loss"] == 0.5
+    assert metrics["peak_memory_mb"] > 0
+
+
+@pytest.mark.parametrize(
+    "stop_after, stop_reason, epochs_run",
+    [(None, "max_epochs", 3), (2, "early_stopping", 2)],
+)
+def test_stop_reason_without_time_budget(tmp_path, stop_after, stop_reason, epochs_run):
+    metrics_path = tmp_path / "metrics.json"
+    monitor = TrainingMonitor(100, str(metrics_path), 32)
+
+    run_epochs(monitor, 3, stop_after)
+
+    metrics = json.loads(metrics_path.read_text())
+    assert metrics["stop_reason"] == stop_reason
+    assert metrics["epochs_run"] == epochs_run
+    assert metrics["time_budget"] == 0
+
+
+def test_train_model_writes_the_training_metrics(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    keras.utils.set_random_seed(0)
+    rng = np.random.default_rng(0)
+    X = rng.random((20, 4, 2)).astype("float32")
+    y = rng.random((20, 3)).astype("float32")
+    model = keras.Sequential(
+        [
+            keras.Input((4, 2)),
+            keras.layers.Flatten(),
+            keras.layers.RepeatVector(3),
+            keras.layers.TimeDistributed(keras.layers.Dense(1)),
+        ]
+    )
+    model.compile(loss="mse", optimizer="adam")
+
+    train_model(
+        X[:16],
+        y[:16],
+        X[16:],
+        y[16:],
+        model,
+        "model.h5",
+        batch_size=5,
+        epochs=3,
+        metrics_path="metrics.json",
+        verbose=0,
+    )
+
+    metrics = json.loads((tmp_path / "metrics.json").read_text())
+    assert metrics["stop_reason"] == "max_epochs"
+    assert metrics["epochs_run"] == 3
+    assert metrics["samples"] == 16 and metrics["batch_size"] == 5
+    assert {"loss", "val_loss"} <= set(metrics["epochs"][0])
+    assert (tmp_path / "model.h5").is_file()
+
+
+def test_rolling_origin_fold_boundaries():
+    assert rolling_origin_folds(20, 3, 3) == [(9, 11, 14), (12, 14, 17), (15, 17, 20)]
+    # One step ahead folds need no gap
+    assert rolling_origin_folds(10, 2, 1) == [(8, 8, 9), (9, 9, 10)]
+
+
+@pytest.mark.parametrize(
+    "n_windows, n_folds, n_steps_out", [(20, 3, 3), (50, 5, 4), (12, 1, 6)]
+)
+def test_rolling_origin_folds_keep_targets_apart(n_windows, n_folds, n_steps_out):
+    folds = rolling_origin_folds(n_windows, n_folds, n_steps_out)
+
+    for train_end, validation_start, validation_end in folds:
+        assert validation_end - validation_start == n_steps_out
+        # The last training window targets end before the first validation step
+        assert (train_end - 1) + (n_steps_out - 1) < validation_start
+    # Validation windows follow each other up to the test windows of the model
+    assert [fold[2] for fold in folds[:-1]] == [fold[1] for fold in folds[1:]]
+    X = np.arange(n_windows)[:, None, None]
+    y = np.arange(n_windows)[:, None]
+    X_test = split_train_test(X, y, n_steps_out)[2]
+    np.testing.assert_array_equal(X[folds[-1][1] : folds[-1][2]], X_test)
+
+
+def test_too_many_rolling_origin_folds_are_rejected():
+    # The first fold would have no training window
+    with pytest.raises(ValueError, match="not enough"):
+        rolling_origin_folds(10, 3, 3)
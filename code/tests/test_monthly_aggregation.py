@@ -0,0 +1,36 @@
+import pandas as pd
+import pytest
+import typer
+
+from monthly_aggregation import monthly_aggregate, parse_aggregation
+
+
+def daily_frame():
+    return pd.DataFrame(
+        {
+            "date": ["2020-02-01", "2020-02-15", "2020-01-10", "2020-01-20"],
+            "pollen": [1, 3, 4, 2],
+            "tmed": [10.0, 14.0, 6.0, 8.0],
+        }
+    )
+
+
+def test_monthly_aggregate_keeps_month_order_and_functions():
+    monthly = monthly_aggregate(daily_frame(), "date", {"tmed": "mean"})
+
+    assert [str(month) for month in monthly.index] == ["2020-02", "2020-01"]
+    assert monthly["pollen"].tolist() == [4.0, 6.0]
+    assert monthly["tmed"].tolist() == [12.0, 7.0]
+
+
+def test_monthly_aggregate_rejects_unknown_columns_and_functions():
+    with pytest.raises(ValueError, match="Unknown columns"):
+        monthly_aggregate(daily_frame(), "date", {"rain": "sum"})
+    with pytest.raises(ValueError, match="Unknown aggregation"):
+        monthly_aggregate(daily_frame(), "date", "median")
+
+
+@pytest.mark.parametrize("entry", ["pollen", "rain:sum", "pollen:median"])
+def test_parse_aggregation_rejects_bad_entries(entry):
+    with pytest.raises(typer.BadParameter):
+        parse_aggregation([entry], ["pollen", "tmed"])
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import typer
+from typer.testing import CliRunner
+
+# The model script is not shared, import it from its component directory
+sys.path.insert(0, str(Path(__file__).parents[1] / "docker" / "SarimaModel"))
+from sarima_model import sarima_model  # noqa: E402
+
+
+def test_unknown_order_search_is_rejected(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    app = typer.Typer()
+    app.command()(sarima_model)
+
+    result = CliRunner().invoke(
+        app,
+        [
+            "--filepath",
+            "split_dataset.csv",
+            "--delimiter",
+            ";",
+            "--seasonality",
+            "12",
+            "--optimize",
+            "--search",
+            "stepwse",
+        ],
+    )
+
+    assert result.exit_code == 2
+    assert "'stepwse' is not one of 'grid', 'stepwise'" in result.output
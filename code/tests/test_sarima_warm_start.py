@@ -0,0 +1,60 @@
+import pytest
+from sarimax_search import (
+    fit_sarimax,
+    start_entry,
+    warm_start_candidates,
+    warm_start_params,
+)
+
+FLAGS = {"enforce_stationarity": False, "enforce_invertibility": False}
+ORDERS = [
+    ((1, 0, 0), (1, 0, 0, 12)),
+    ((2, 0, 1), (1, 0, 1, 12)),
+    ((1, 0, 1), (2, 0, 1, 12)),
+]
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_warm_start_from_a_prefix_saves_iterations(monthly_pollen):
+    series = monthly_pollen(seed=0, years=12)
+
+    cold_iterations = warm_iterations = 0
+    for order, seasonal_order in ORDERS:
+        # The previous run fitted the same orders one year earlier
+        previous = fit_sarimax(None, series[:-12], None, order, seasonal_order, **FLAGS)
+        candidates = warm_start_candidates(
+            [start_entry(previous)], series, None, **FLAGS
+        )
+        assert len(candidates) == 1
+
+        cold = fit_sarimax(None, series, None, order, seasonal_order, **FLAGS)
+        warm = fit_sarimax(
+            None,
+            series,
+            None,
+            order,
+            seasonal_order,
+            start_candidates=candidates,
+            **FLAGS,
+        )
+        assert warm.mle_retvals["converged"]
+        assert warm.aic == pytest.approx(cold.aic, abs=0.1)
+        cold_iterations += cold.mle_retvals["iterations"]
+        warm_iterations += warm.mle_retvals["iterations"]
+
+    assert warm_iterations < cold_iterations
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_other_orders_and_series_are_not_used(monthly_pollen):
+    series = monthly_pollen(seed=0, years=12)
+    previous = fit_sarimax(None, series[:-12], None, (1, 0, 0), (1, 0, 0, 12), **FLAGS)
+    entries = [start_entry(previous)]
+
+    other_order = fit_sarimax(
+        None, series, None, (2, 0, 0), (1, 0, 0, 12), maxiter=1, **FLAGS
+    ).model
+    assert warm_start_params(other_order, entries) is None
+
+    other_series = monthly_pollen(seed=1, years=12)
+    assert warm_start_candidates(entries, other_series, None, **FLAGS) == []
@@ -0,0 +1,115 @@
+import itertools
+
+import pytest
+import sarimax_search
+from sarimax_search import (
+    SarimaxFitCache,
+    _set_fit_state,
+    cached_fit,
+    fit_aic,
+    stepwise_search,
+)
+
+SEEDS = [
+    (1, 0, 0, 0, 0, 0),
+    (2, 0, 2, 1, 0, 1),
+    (0, 0, 0, 0, 0, 0),
+    (1, 0, 0, 1, 0, 0),
+    (0, 0, 1, 0, 0, 1),
+]
+BOUNDS = [(0, 2), (0, 0), (0, 2), (0, 2), (0, 0), (0, 2)]
+
+
+def evaluate_in_process(orders, maxiter, start_params):
+    return [
+        fit_aic(order, 12, maxiter=maxiter, start_params=start)[1:3]
+        for order, start in zip(orders, start_params)
+    ]
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_stepwise_finds_the_grid_optimum(monthly_pollen):
+    _set_fit_state(monthly_pollen(), None)
+
+    grid = {}
+    for order in itertools.product(*(range(low, high + 1) for low, high in BOUNDS)):
+        _, aic, _, _ = fit_aic(order, 12)
+        if aic is not None:
+            grid[order] = aic
+    grid_best = min(grid, key=grid.get)
+
+    result_table, full_fits, _ = stepwise_search(evaluate_in_process, SEEDS, BOUNDS)
+
+    assert result_table.parameters[0] == grid_best
+    assert result_table.aic[0] == pytest.approx(grid[grid_best], abs=0.1)
+    assert full_fits < len(grid)
+
+
+def test_short_fits_are_ranked_and_resumed():
+    # Short fits are far above every full fit, as unfinished fits often are,
+    # the optimum must still be reached by resuming the best ranked ones
+    optimum = (2, 0, 0, 2, 0, 1)
+
+    def full_aic(order):
+        return 700 + 25 * sum(abs(a - b) for a, b in zip(order, optimum))
+
+    resumed = []
+
+    def evaluate(orders, maxiter, start_params):
+        results = []
+        for order, start in zip(orders, start_params):
+            if maxiter:
+                results.append((full_aic(order) + 300, ["short", order]))
+            else:
+                if start is not None:
+                    assert start == ["short", order]
+                    resumed.append(order)
+                results.append((full_aic(order), ["full", order]))
+        return results
+
+    result_table, _, partial_fits = stepwise_search(evaluate, SEEDS, BOUNDS)
+
+    assert result_table.parameters[0] == optimum
+    assert result_table.aic[0] == 700
+    assert partial_fits > 0 and optimum in resumed
+
+
+def test_stepwise_without_any_converged_fit():
+    result_table, _, partial_fits = stepwise_search(
+        lambda orders, maxiter, start_params: [(None, None)] * len(orders),
+        SEEDS,
+        BOUNDS,
+    )
+
+    assert result_table.empty
+    assert partial_fits == 0
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_timed_out_fit_is_reported(monthly_pollen):
+    _set_fit_state(monthly_pollen(years=20), None)
+
+    _, aic, params, timed_out = fit_aic((2, 0, 2, 2, 0, 2), 12, timeout=1e-3)
+    assert (aic, params, timed_out) == (None, None, True)
+
+    _, aic, _, timed_out = fit_aic((1, 0, 0, 0, 0, 0), 12, timeout=60)
+    assert aic is not None and not timed_out
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_cache_miss_hashes_the_series_once(tmp_path, monkeypatch, monthly_pollen):
+    keys = []
+    key = SarimaxFitCache.key
+
+    def counted_key(*args, **kwargs):
+        keys.append(key(*args, **kwargs))
+        return keys[-1]
+
+    monkeypatch.setattr(sarimax_search.SarimaxFitCache, "key", counted_key)
+    cache = SarimaxFitCache(tmp_path)
+    series = monthly_pollen()
+
+    aic, params = cached_fit(cache, series, None, (1, 0, 0), (1, 0, 0, 12))
+
+    assert len(keys) == 1
+    assert cache.get(keys[0]) == {"params": params, "aic": aic}
@@ -0,0 +1,112 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# The windowing script is not shared, import it from its component directory
+sys.path.insert(
+    0, str(Path(__file__).parents[1] / "docker" / "SplitSequencesMultivariable")
+)
+from split_sequences_multivariable import (  # noqa: E402
+    save_windows,
+    split_sequences_multivariable,
+    supervised_windows,
+)
+
+
+def loop_windows(sequences_x, sequences_y, n_steps_in, n_steps_out):
+    # Windows of the loop the strided views replaced
+    X, y = list(), list()
+    for i in range(len(sequences_x)):
+        end_ix = i + n_steps_in
+        out_end_ix = end_ix + n_steps_out - 1
+        if out_end_ix > len(sequences_x):
+            break
+        X.append(sequences_x[i:end_ix, :-1])
+        y.append(sequences_y[end_ix - 1 : out_end_ix])
+    return np.array(X), np.array(y)
+
+
+def sequences(n, features=3, targets=None):
+    rng = np.random.default_rng(n)
+    sequences_x = rng.random((n, features + 1))
+    shape = (n,) if targets is None else (n, targets)
+    return sequences_x, rng.random(shape)
+
+
+@pytest.mark.parametrize(
+    "n, n_steps_in, n_steps_out, targets",
+    [
+        (30, 5, 3, None),
+        (30, 1, 1, None),
+        (30, 7, 1, 2),
+        (12, 6, 7, None),
+        (12, 12, 1, None),
+    ],
+)
+def test_windows_match_the_loop(n, n_steps_in, n_steps_out, targets):
+    sequences_x, sequences_y = sequences(n, targets=targets)
+
+    X, y = supervised_windows(sequences_x, sequences_y, n_steps_in, n_steps_out)
+    X_loop, y_loop = loop_windows(sequences_x, sequences_y, n_steps_in, n_steps_out)
+
+    assert X.shape == X_loop.shape
+    assert y.shape == y_loop.shape
+    np.testing.assert_array_equal(X, X_loop)
+    np.testing.assert_array_equal(y, y_loop)
+    # Views of the input, no window is copied
+    assert np.shares_memory(X, sequences_x)
+
+
+def test_series_shorter_than_a_window_has_no_windows():
+    sequences_x, sequences_y = sequences(6)
+
+    X, y = supervised_windows(sequences_x, sequences_y, 5, 3)
+
+    assert X.shape == (0, 5, 3)
+    assert y.shape == (0, 3)
+
+
+def test_save_windows_writes_the_np_save_file(tmp_path):
+    sequences_x, sequences_y = sequences(50)
+    X, _ = supervised_windows(sequences_x, sequences_y, 6, 2)
+
+    save_windows(tmp_path / "batched.npy", X, batch_size=4)
+    np.save(tmp_path / "saved.npy", np.ascontiguousarray(X))
+
+    assert (tmp_path / "batched.npy").read_bytes() == (
+        tmp_path / "saved.npy"
+    ).read_bytes()
+
+
+@pytest.mark.parametrize("materialize", [False, True])
+def test_component_files_match_the_loop(tmp_path, monkeypatch, materialize):
+    data = tmp_path / "data"
+    data.mkdir()
+    monkeypatch.chdir(tmp_path)
+    sequences_x, sequences_y = sequences(40)
+    np.savetxt(data / "features.csv", sequences_x, delimiter=";")
+    np.savetxt(data / "target.csv", sequences_y, delimiter=";")
+
+    split_sequences_multivariable(
+        filepath_features="features.csv",
+        filepath_target="target.csv",
+        n_steps_in=6,
+        n_steps_out=3,
+        delimiter=";",
+        materialize=materialize,
+        output_format="csv",
+    )
+
+    # Compare with the loop on the values read back from the csv files
+    X_loop, y_loop = loop_windows(
+        np.loadtxt(data / "features.csv", delimiter=";"),
+        np.loadtxt(data / "target.csv", delimiter=";"),
+        6,
+        3,
+    )
+    np.testing.assert_array_equal(np.load(data / "sequences_X.npy"), X_loop)
+    np.testing.assert_array_equal(
+        np.loadtxt(data / "sequences_Y.csv", delimiter=";"), y_loop
+    )